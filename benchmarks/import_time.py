@@ -0,0 +1,75 @@
+"""import time benchmark for src.mashadb
+
+   each run imports the module in a fresh interpreter and reports the
+   wall time of the import statement alone. the run fails when a module
+   listed in FORBIDDEN is loaded as a side effect of the import, or when
+   the median exceeds the optional budget.
+
+   USAGE:
+        python benchmarks/import_time.py
+        python benchmarks/import_time.py --runs 20 --budget 150
+"""
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+from statistics import median
+
+ROOT = Path(__file__).resolve().parent.parent
+FORBIDDEN = ('pandas', 'numpy')
+
+PROBE = f"""
+import sys, time, json
+start = time.perf_counter()
+import src.mashadb
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {FORBIDDEN!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module='src.mashadb'):
+    """import module in a fresh interpreter, returns (seconds, loaded)"""
+    probe = PROBE.replace('src.mashadb', module)
+    output = subprocess.run([sys.executable, '-c', probe], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result['seconds'], result['loaded']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=None, help='median budget in milliseconds')
+    parser.add_argument('--module', default='src.mashadb')
+    args = parser.parse_args(argv)
+
+    timings, loaded = [], set()
+    for _ in range(args.runs):
+        seconds, modules = measure(args.module)
+        timings.append(seconds * 1000)
+        loaded.update(modules)
+
+    report = {
+        'module': args.module,
+        'runs': args.runs,
+        'min_ms': round(min(timings), 2),
+        'median_ms': round(median(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'loaded': sorted(loaded),
+    }
+    print(json.dumps(report, indent=2))
+
+    if loaded:
+        print(f"FAIL: importing {args.module} loads {', '.join(sorted(loaded))}", file=sys.stderr)
+        return 1
+
+    if args.budget is not None and report['median_ms'] > args.budget:
+        print(f"FAIL: median import time {report['median_ms']}ms exceeds {args.budget}ms", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""benchmark suite for the MashaDB hot paths
+
+   each benchmark runs against a table filled to every size in --sizes
+   and reports operations and rows per second, latency percentiles and
+   the peak memory allocated by python during one extra traced pass.
+   the results are saved as JSON; --compare prints the change against an
+   earlier results file.
+
+   the suite connects to the server described by the MASHADB_HOST,
+   MASHADB_USER, MASHADB_PASSWORD and MASHADB_DATABASE environment
+   variables. with --sqlite, or when the server cannot be reached, it
+   runs on the in-memory sqlite backend; those timings show the overhead
+   of the python layers, not the cost of a server round trip.
+
+   USAGE:
+        python benchmarks/suite.py
+        python benchmarks/suite.py --sizes 1000 10000 100000 --repeat 50
+        python benchmarks/suite.py --sqlite --only where_range where_like record_exists
+        python benchmarks/suite.py --compare benchmarks/results/old.json
+"""
+import gc
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.mashadb import MashaDB  # noqa: E402
+from benchmarks.import_time import measure  # noqa: E402
+
+TABLE = 'masha_bench'
+CITIES = ('Berlin', 'Paris', 'London', 'Rome', 'Madrid', 'Vienna', 'Prague', 'Lisbon')
+
+
+def config():
+    """connection arguments from the environment"""
+    return {
+        'host': os.environ.get('MASHADB_HOST', 'localhost'),
+        'user': os.environ.get('MASHADB_USER', 'root'),
+        'password': os.environ.get('MASHADB_PASSWORD', ''),
+        'database': os.environ.get('MASHADB_DATABASE', 'masha_bench'),
+    }
+
+
+def connect(sqlite=False):
+    """returns a connected MashaDB and the name of its backend"""
+    if not sqlite:
+        db = MashaDB(**config())
+        db.verbose = False
+        db.connect()
+        if db.__dict__.get('version'):
+            return db, db.backend.name
+
+        print('no server reachable, using the sqlite backend', file=sys.stderr)
+
+    db = MashaDB(backend='sqlite')
+    db.verbose = False
+    db.connect()
+    return db, db.backend.name
+
+
+def row(index):
+    return {'name': f"name{index:07d}", 'city': CITIES[index % len(CITIES)], 'score': index % 1000}
+
+
+def prepare(db, size):
+    """recreate the benchmark table with size rows"""
+    if db.table_exists(TABLE):
+        db.drop(TABLE)
+    db.create(TABLE, id='INT AUTO_INCREMENT PRIMARY KEY', name='VARCHAR(40)',
+              city='VARCHAR(40)', score='INT')
+    table = getattr(db, TABLE)
+    table.verbose = False
+    table.write_many((row(index) for index in range(size)), batch_size=5000)
+    db.commit()
+    return table
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(name, size, operation, repeat):
+    """time repeat calls of operation, which returns the rows it touched"""
+    timings, rows = [], 0
+    gc.collect()
+    for index in range(repeat):
+        start = time.perf_counter()
+        rows += operation(index) or 0
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    operation(repeat)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    seconds = sum(timings)
+    return {
+        'benchmark': name,
+        'size': size,
+        'ops': repeat,
+        'rows': rows,
+        'seconds': round(seconds, 6),
+        'ops_per_sec': round(repeat / seconds, 1) if seconds else None,
+        'rows_per_sec': round(rows / seconds, 1) if seconds else None,
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 4),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 4),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 4),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def operations(db, table, size):
+    """the benchmarked operations for a table of size rows. each takes the
+       repetition index and returns the number of rows it read or wrote.
+       the inserting benchmarks come last, as the rows they add would
+       make every later benchmark run on a larger table than its size.
+    """
+    span = max(1, min(1000, size // 10))
+    selector = table.select('id', 'name', 'city', 'score')
+
+    def window(index):
+        low = (index * 7919) % max(1, size - span) + 1
+        return low, low + span - 1
+
+    def write(index):
+        table.write(**row(size + index))
+        return 1
+
+    def write_many(index):
+        table.write_many([row(size + index * 100 + offset) for offset in range(100)])
+        return 100
+
+    def update(index):
+        table.update((index * 7919) % size + 1, score=index)
+        return 1
+
+    return {
+        'all': lambda index: len(selector.all()),
+        'all_limit': lambda index: len(selector.all(sort='id', limit=span)),
+        'where_equal': lambda index: len(selector.where(city=CITIES[index % len(CITIES)], limit=span)),
+        'where_range': lambda index: len(selector.where(id='{}..{}'.format(*window(index)))),
+        'where_greater': lambda index: len(selector.where(id=f"+{size - span}")),
+        'where_less': lambda index: len(selector.where(id=f"-{span}")),
+        'where_like': lambda index: len(selector.where(name=f"%{index % 10}", limit=span)),
+        'where_or': lambda index: len(selector.where(city='Berlin or Paris or Rome', limit=span)),
+        'update': update,
+        'record_exists': lambda index: int(bool(table.record_exists('name', f"name{(index * 7919) % size:07d}"))),
+        'distinct': lambda index: len(table.distinct('city')),
+        'write': write,
+        'write_many': write_many,
+    }
+
+
+def connect_time(sqlite, repeat):
+    def operation(index):
+        db, _ = connect(sqlite)
+        db.closeall()
+        return 0
+
+    return run('connect', 0, operation, repeat)
+
+
+def import_time(repeat):
+    timings = [measure()[0] for _ in range(repeat)]
+    return {'benchmark': 'import', 'size': 0, 'ops': repeat, 'rows': 0,
+            'seconds': round(sum(timings), 6), 'ops_per_sec': None, 'rows_per_sec': None,
+            'p50_ms': round(percentile(timings, 0.50) * 1000, 4),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 4),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 4), 'peak_kb': None}
+
+
+def compare(results, path):
+    """print the change in p50 latency and throughput against an earlier run"""
+    earlier = {(result['benchmark'], result['size']): result for result in json.loads(Path(path).read_text())['results']}
+    print(f"\n{'benchmark':<16}{'size':>10}{'p50 ms':>12}{'change':>10}{'rows/s':>14}{'change':>10}")
+    for result in results:
+        before = earlier.get((result['benchmark'], result['size']))
+        if before is None:
+            continue
+
+        latency = (result['p50_ms'] / before['p50_ms'] - 1) * 100 if before['p50_ms'] else 0.0
+        throughput = (result['rows_per_sec'] / before['rows_per_sec'] - 1) * 100 if before.get('rows_per_sec') and result['rows_per_sec'] else 0.0
+        print(f"{result['benchmark']:<16}{result['size']:>10}{result['p50_ms']:>12}{latency:>+9.1f}%"
+              f"{result['rows_per_sec'] or '':>14}{throughput:>+9.1f}%")
+
+
+def report(results):
+    print(f"{'benchmark':<16}{'size':>10}{'ops/s':>12}{'rows/s':>14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak kb':>10}")
+    for result in results:
+        print(f"{result['benchmark']:<16}{result['size']:>10}{result['ops_per_sec'] or '':>12}{result['rows_per_sec'] or '':>14}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}{result['peak_kb'] or '':>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--only', nargs='+', default=None, help='names of the benchmarks to run')
+    parser.add_argument('--sqlite', action='store_true', help='use the in-memory sqlite backend')
+    parser.add_argument('--output', default=None, help='results file; defaults to benchmarks/results/<time>.json')
+    parser.add_argument('--compare', default=None, help='earlier results file to compare against')
+    args = parser.parse_args(argv)
+
+    db, backend = connect(args.sqlite)
+    selected = (lambda name: args.only is None or name in args.only)
+    results = []
+    for size in args.sizes:
+        table = prepare(db, size)
+        for name, operation in operations(db, table, size).items():
+            if selected(name):
+                results.append(run(name, size, operation, args.repeat))
+                db.commit()
+
+    db.drop(TABLE)
+    db.closeall()
+
+    if selected('connect'):
+        results.append(connect_time(backend == 'sqlite', args.repeat))
+
+    if selected('import'):
+        results.append(import_time(min(args.repeat, 10)))
+
+    report(results)
+    output = Path(args.output) if args.output else ROOT / 'benchmarks' / 'results' / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'backend': backend,
+        'server': db.version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': args.sizes,
+        'repeat': args.repeat,
+        'results': results,
+    }, indent=2))
+    print(f"\nresults saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
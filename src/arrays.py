@@ -0,0 +1,108 @@
+"""typed numpy columns filled from fetchmany() chunks
+
+   Selector.to_arrays(), to_numpy() and to_frame() read their rows from
+   an unbuffered cursor chunk by chunk and copy each chunk straight into
+   numpy columns typed from the table schema, so no list of row tuples
+   is ever built for the whole result. a collected result grows its
+   columns by doubling and trims them at the end; a chunked result
+   allocates each chunk exactly and is dropped once consumed.
+
+   column types follow Schema.dtypes: integers become int64, nullable
+   integers, floats and decimals float64 with NULL as nan, dates and
+   times datetime64 and timedelta64 with NULL as NaT, and sized
+   strings fixed width unicode or bytes with NULL as an empty string.
+   unsized strings, blobs and computed columns are kept as objects.
+
+   numpy is imported on first use.
+"""
+FILLS = {'U': '', 'S': b''}
+
+
+def dtypes(names, schema):
+    """numpy dtype strings of the named columns"""
+    known = schema.dtypes if schema is not None else {}
+    kinds = [known.get(name, 'O') for name in names]
+    return [(name, 'O' if kind in ('U', 'S') else kind) for name, kind in zip(names, kinds)]
+
+
+class Columns:
+    """typed columns of a result, as separate arrays or as the fields of
+       one structured array.
+    """
+
+    def __init__(self, names, schema, capacity=1024, structured=False):
+        import numpy as np
+
+        self.np = np
+        self.names = list(names)
+        self.dtype = np.dtype(dtypes(self.names, schema))
+        self.structured = structured
+        self.fills = [FILLS.get(self.dtype[name].kind) for name in self.names]
+        self.size = 0
+        self.storage = None
+        self.columns = []
+        self.__allocate__(max(1, capacity))
+
+    def __len__(self):
+        return self.size
+
+    def __allocate__(self, capacity):
+        np = self.np
+        if self.structured:
+            storage = np.empty(capacity, dtype=self.dtype)
+            if self.storage is not None:
+                storage[:self.size] = self.storage[:self.size]
+            self.storage = storage
+            self.columns = [storage[name] for name in self.names]
+            return
+
+        columns = [np.empty(capacity, dtype=self.dtype[name]) for name in self.names]
+        for column, old in zip(columns, self.columns):
+            column[:self.size] = old[:self.size]
+        self.columns = columns
+
+    def extend(self, rows):
+        """append a chunk of row tuples"""
+        end = self.size + len(rows)
+        if end > len(self.columns[0]):
+            self.__allocate__(max(end, 2 * len(self.columns[0])))
+
+        for column, values, fill in zip(self.columns, zip(*rows), self.fills):
+            if fill is not None and None in values:
+                values = [fill if value is None else value for value in values]
+            column[self.size:end] = values
+
+        self.size = end
+
+    def arrays(self):
+        """dict of column name to array"""
+        return {name: column[:self.size] for name, column in zip(self.names, self.columns)}
+
+    def records(self):
+        """the structured array"""
+        return self.storage[:self.size]
+
+    def frame(self):
+        """a pandas DataFrame of the columns"""
+        from pandas import DataFrame
+
+        return DataFrame(self.arrays(), copy=False)
+
+
+def collect(chunks, names, schema, capacity=1024, structured=False):
+    """fill one set of columns from every (names, rows) chunk"""
+    columns = None
+    for described, rows in chunks:
+        if columns is None:
+            columns = Columns(described, schema, max(capacity, len(rows)), structured)
+        columns.extend(rows)
+
+    return columns if columns is not None else Columns(names, schema, 1, structured)
+
+
+def chunked(chunks, schema, structured=False):
+    """yield one set of columns per (names, rows) chunk"""
+    for names, rows in chunks:
+        columns = Columns(names, schema, len(rows), structured)
+        columns.extend(rows)
+        yield columns
@@ -0,0 +1,805 @@
+"""asyncio interface for MySQL, MariaDB and SQLite
+
+   AsyncMashaDB has the Table and Selector API of MashaDB with every
+   database call awaitable. statements run on an async connection pool:
+   each task checks out its own connection on its first statement and
+   returns it when the statement ends, so thousands of tasks can keep
+   queries in flight over pool_size connections. as in the pooled mode
+   of MashaDB, a task that writes keeps its connection until it calls
+   commit() or rollback(); a task that ends holding uncommitted writes
+   has them rolled back, with an alert, and its connection returned.
+   tasks started by a task holding uncommitted writes, e.g. through
+   asyncio.gather, run on its connection and inside its transaction,
+   one statement at a time. to write from several tasks and commit
+   once, start them in a transaction() block.
+
+   MySQL and MariaDB are reached through aiomysql, which is imported
+   when the first AsyncMashaDB connects. the sqlite backend runs the
+   sqlite3 connections of the backend in worker threads; an in-memory
+   database has a pool of one connection that tasks wait for in turn.
+
+   the statement and result caches and the instrumentation of MashaDB
+   are not available here.
+
+   USAGE:
+        db = AsyncMashaDB(pool_size=20, **config)
+        await db.connect()
+        await db.users.write(name='Al', city='Berlin')
+        await db.commit()
+
+        rows = await db.users.select('name').where(city='Berlin', limit=10)
+        async for row in db.users.select('name', 'city').iter(chunk_size=5000):
+            process(row)
+
+        async with AsyncMashaDB(**config) as db:
+            count = await db.users.rows
+
+        async with db.transaction():
+            await asyncio.gather(*(db.users.write(**row) for row in rows))
+"""
+import asyncio
+import weakref
+import contextvars
+from itertools import chain
+from functools import wraps
+from contextlib import suppress, asynccontextmanager
+
+from mysql.connector import Error as SQLError
+
+from src.utilities import echo
+from src.backends import Backend
+from src.mashadb import MashaDB
+from src.query import compose
+from src.columns import Schema
+from src.boundinnerclass import BoundInnerClass
+
+
+def pooled(write=False):
+    """run an AsyncMashaDB, Table or Selector coroutine on the calling
+       task's connection. the first statement of a task checks a
+       connection out of the pool; it is returned when the outermost
+       call ends unless a write pinned it to the task. a pinned session
+       is shared with the tasks the task starts afterwards.
+    """
+    def decorator(method):
+        @wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            db = getattr(self, '_db', self)
+            session = await db.__checkout__()
+            session.depth += 1
+            try:
+                return await method(self, *args, **kwargs)
+
+            finally:
+                session.depth -= 1
+                if write and not session.pinned:
+                    session.pinned = True
+                    db._shared.set(session)
+                if session.depth == 0:
+                    await db.__release__(session)
+
+        return wrapper
+    return decorator
+
+
+class Session:
+    """the connection checked out by one task"""
+
+    def __init__(self, task, konnect):
+        self.task = task
+        self.konnect = konnect
+        self.pinned = False
+        self.depth = 0
+
+
+class AioConnection:
+    """an aiomysql connection"""
+
+    def __init__(self, konnect, aiomysql):
+        self._konnect = konnect
+        self._aiomysql = aiomysql
+        self.version = konnect.get_server_info()
+        # tasks sharing a transaction take turns on the connection
+        self.lock = asyncio.Lock()
+
+    async def run(self, statement, params=()):
+        """execute a statement. returns its rows, or None when it has no
+           result, and its row count.
+        """
+        try:
+            async with self.lock, self._konnect.cursor() as kursor:
+                await kursor.execute(statement, tuple(params) or None)
+                rows = await kursor.fetchall() if kursor.description else None
+                return rows, kursor.rowcount
+
+        except self._aiomysql.MySQLError as error:
+            raise SQLError(msg=str(error)) from error
+
+    async def stream(self, statement, params=(), chunk_size=1000):
+        """yield the rows of a statement chunk_size rows at a time from an
+           unbuffered cursor.
+        """
+        try:
+            async with self._konnect.cursor(self._aiomysql.SSCursor) as kursor:
+                await kursor.execute(statement, tuple(params) or None)
+                while rows := await kursor.fetchmany(chunk_size):
+                    yield rows
+
+        except self._aiomysql.MySQLError as error:
+            raise SQLError(msg=str(error)) from error
+
+    async def commit(self):
+        async with self.lock:
+            await self._konnect.commit()
+
+    async def rollback(self):
+        async with self.lock:
+            await self._konnect.rollback()
+
+
+class AioPool:
+    """aiomysql connection pool"""
+
+    def __init__(self, pool, aiomysql):
+        self._pool = pool
+        self._aiomysql = aiomysql
+
+    @classmethod
+    async def open(cls, size, config):
+        import aiomysql
+
+        config = dict(config)
+        if 'database' in config:
+            config['db'] = config.pop('database')
+
+        pool = await aiomysql.create_pool(minsize=1, maxsize=size, autocommit=False, **config)
+        return cls(pool, aiomysql)
+
+    async def acquire(self):
+        return AioConnection(await self._pool.acquire(), self._aiomysql)
+
+    async def release(self, konnect):
+        self._pool.release(konnect._konnect)
+
+    async def close(self):
+        self._pool.close()
+        await self._pool.wait_closed()
+
+
+class ThreadConnection:
+    """a connection of a synchronous backend whose calls run in worker
+       threads so that they do not block the event loop.
+    """
+
+    def __init__(self, konnect):
+        self._konnect = konnect
+        self.version = konnect.get_server_info()
+        self.lock = asyncio.Lock()
+
+    async def run(self, statement, params=()):
+        def run():
+            kursor = self._konnect.cursor()
+            try:
+                kursor.execute(statement, tuple(params))
+                return kursor.fetchall() if kursor.with_rows else None, kursor.rowcount
+
+            finally:
+                kursor.close()
+
+        async with self.lock:
+            return await asyncio.to_thread(run)
+
+    async def stream(self, statement, params=(), chunk_size=1000):
+        kursor = self._konnect.cursor()
+        try:
+            await asyncio.to_thread(kursor.execute, statement, tuple(params))
+            while rows := await asyncio.to_thread(kursor.fetchmany, chunk_size):
+                yield rows
+
+        finally:
+            kursor.close()
+
+    async def commit(self):
+        async with self.lock:
+            await asyncio.to_thread(self._konnect.commit)
+
+    async def rollback(self):
+        async with self.lock:
+            await asyncio.to_thread(self._konnect.rollback)
+
+
+class ThreadPool:
+    """fixed size pool of synchronous backend connections"""
+
+    def __init__(self, backend, size, config):
+        self.backend = backend
+        self.config = config
+        self.slots = asyncio.Semaphore(size)
+        self.idle = []
+
+    @classmethod
+    async def open(cls, backend, size, config):
+        return cls(backend, size, config)
+
+    async def acquire(self):
+        await self.slots.acquire()
+        try:
+            if self.idle:
+                return self.idle.pop()
+
+            return ThreadConnection(await asyncio.to_thread(self.backend.connect, self.config))
+
+        except BaseException:
+            self.slots.release()
+            raise
+
+    async def release(self, konnect):
+        self.idle.append(konnect)
+        self.slots.release()
+
+    async def close(self):
+        idle, self.idle = self.idle, []
+        for konnect in idle:
+            konnect._konnect.close()
+
+        self.backend.close()
+
+
+class AsyncMashaDB:
+    """asyncio interface for MySQL and MariaDB
+
+       USAGE:
+            Connect and Commit:
+
+            db = AsyncMashaDB(pool_size=20, **config)
+            await db.connect(database=db_name)
+            await db.commit()
+            await db.closeall()
+
+            Write Operations:
+
+            await db.table.write(**data)
+            await db.table.write_many(rows, batch_size=1000)
+            await db.table.update(id, column=data)
+            await db.table.delete(column, value)
+
+            Read Operations:
+
+            data = await db.table.select(column).all(sort=column, limit=10)
+            data = await db.table.select(column).where(clause, limit=10)
+            count = await db.table.rows
+            async for row in db.table.select(column).iter(column=value):
+                process(row)
+
+            With Context Manager:
+            Automatically commits data and closes the pool.
+
+            async with AsyncMashaDB(**config) as db:
+                await db.table.write(**data)
+    """
+
+    def __init__(self, pool_size=10, backend=None, **kwargs):
+        """ ARGUMENTS:
+                pool_size=number of pooled connections shared by all tasks
+                backend='mysql' (default) or 'sqlite', or a Backend
+
+                every other keyword argument is passed to aiomysql, or to
+                sqlite3 for the sqlite backend; database is passed to
+                aiomysql as db.
+
+            USAGE:
+                db = AsyncMashaDB(user=user, password=password, host=host, database=database)
+                db = AsyncMashaDB(backend='sqlite', database='app.db')
+        """
+        self.verbose = True
+        self.backend = Backend.create(backend)
+        self.config = {**self.backend.defaults, **kwargs}
+        self.host = self.config.get('host')
+        self.database = self.config.get('database')
+        # tasks share one connection where the backend allows no more
+        self.pool_size = max(1, min(pool_size, self.backend.pool_limit(self.config) or pool_size))
+        self.pool = None
+        self.version = None
+        self._sessions = {}
+        # the pinned session inherited by the tasks a task starts
+        self._shared = contextvars.ContextVar(f'shared_{id(self)}', default=None)
+        self._watched = weakref.WeakSet()
+        self._schemas = {}
+        self._tables = None
+
+    def __repr__(self):
+        name = type(self).__name__
+        if self.version is None:
+            return f"{name} isn't connected. Use await obj.connect() to connect to {self.host}."
+
+        return f"{name} Version {self.version}: Connected to {self.config.get('database', self.host)}"
+
+    def __getattr__(self, name):
+        """bind the tables listed at connect as attributes on first access"""
+        if name.startswith('_') or self.__dict__.get('_tables') is None:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        if name not in self._tables:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute or table '{name}'")
+
+        table = self.Table(name)
+        setattr(self, name, table)
+        return table
+
+    def __dir__(self):
+        return list(super().__dir__()) + list(self._tables or ())
+
+    async def __aenter__(self):
+        self.verbose = False
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, traceback):
+        await self.commit()
+        await self.closeall()
+
+    async def __open__(self):
+        if self.backend.name == 'mysql':
+            return await AioPool.open(self.pool_size, self.config)
+
+        return await ThreadPool.open(self.backend, self.pool_size, self.config)
+
+    def __session__(self):
+        """the session serving the calling task: its own, or the open
+           pinned session of the task that started it.
+        """
+        task = asyncio.current_task()
+        session = self._sessions.get(task)
+        if session is None:
+            shared = self._shared.get()
+            if shared is not None and self._sessions.get(shared.task) is shared:
+                return shared
+
+        return session
+
+    async def __checkout__(self):
+        """the calling task's session; checks a connection out of the
+           pool on the task's first statement. waits while every pooled
+           connection is in use.
+        """
+        task = asyncio.current_task()
+        session = self.__session__()
+        if session is None:
+            session = Session(task, await self.pool.acquire())
+            self._sessions[task] = session
+            if task not in self._watched:
+                self._watched.add(task)
+                task.add_done_callback(self.__orphaned__)
+
+        return session
+
+    async def __release__(self, session=None, force=False):
+        """return a session's connection to the pool unless it holds
+           uncommitted writes.
+        """
+        session = session or self.__session__()
+        if session is None or (session.pinned and not force) or self._sessions.get(session.task) is not session:
+            return
+
+        del self._sessions[session.task]
+        try:
+            await session.konnect.rollback()
+
+        finally:
+            await self.pool.release(session.konnect)
+
+    def __orphaned__(self, task):
+        """roll back and return the connection of a task that ended"""
+        session = self._sessions.get(task)
+        if session is not None:
+            if session.pinned:
+                echo.alert(f"{task.get_name()} ended without commit(); its writes were rolled back")
+
+            with suppress(RuntimeError):
+                task.get_loop().create_task(self.__release__(session, force=True))
+
+    @property
+    def konnect(self):
+        """the connection serving the calling task"""
+        return self.__session__().konnect
+
+    async def __list_tables__(self):
+        rows, _ = await self.konnect.run(self.backend.tables())
+        return tuple(chain(*rows))
+
+    async def connect(self, database=None):
+        if database:
+            self.config.update({'database': database})
+
+        connection = self.config.get('database', self.host)
+        try:
+            self.pool = await self.__open__()
+            await self.__connected__()
+            if self.verbose:
+                echo.info(f"{type(self).__name__} {self.version} Connected to {connection}")
+
+        except SQLError as error:
+            echo.alert(error)
+
+    @pooled()
+    async def __connected__(self):
+        self.version = self.konnect.version
+        if self.config.get('database'):
+            self._tables = await self.__list_tables__()
+
+    @pooled()
+    async def tables(self):
+        """returns the tables contained in the database"""
+        try:
+            self._tables = await self.__list_tables__()
+            return self._tables
+
+        except SQLError as error:
+            echo.alert(error)
+
+    @pooled()
+    async def table_exists(self, table):
+        """checks for the existence of a table in the database"""
+        rows, _ = await self.konnect.run(self.backend.table_exists(table))
+        return bool(rows)
+
+    @pooled()
+    async def max_packet(self):
+        """returns the server's max_allowed_packet size in bytes"""
+        if '_max_packet' not in self.__dict__:
+            rows, _ = await self.konnect.run(self.backend.max_packet())
+            self._max_packet = int(rows[0][0])
+
+        return self._max_packet
+
+    @pooled(write=True)
+    async def execute(self, query, params=()):
+        """execute any statement. returns the values of its rows"""
+        try:
+            rows, count = await self.konnect.run(query, params)
+            if query.lstrip().split(' ', 1)[0].upper() in ('ALTER', 'CREATE', 'DROP', 'RENAME'):
+                self._schemas.clear()
+                self._tables = await self.__list_tables__()
+
+            if rows is not None:
+                return tuple(chain(*rows))
+
+            if self.verbose:
+                echo.info(f"Number of affected rows: {count}")
+
+        except SQLError as error:
+            echo.alert(error)
+
+    @pooled(write=True)
+    async def create(self, table, **kwargs):
+        """create a new table in the database; see MashaDB.create"""
+        statement = [self.backend.column(key, value) for key, value in kwargs.items()]
+        try:
+            await self.konnect.run(f"CREATE TABLE IF NOT EXISTS {table}({', '.join(statement)})")
+            self._tables = tuple(sorted({*(self._tables or ()), table}))
+            if self.verbose:
+                echo.info(f'Created Table {table}')
+
+        except SQLError as error:
+            echo.alert(f"{error}")
+        else:
+            setattr(self, table, self.Table(table))
+
+    @pooled(write=True)
+    async def drop(self, table):
+        """remove specified table from the database"""
+        try:
+            await self.konnect.run(f"DROP TABLE IF EXISTS {table}")
+            self.__dict__.pop(table, None)
+            self._schemas.pop(table, None)
+            self._tables = tuple(name for name in self._tables or () if name != table)
+
+        except SQLError as error:
+            echo.alert(error)
+
+        else:
+            if self.verbose:
+                echo.info(f"Table {table} has been deleted.")
+
+    async def commit(self):
+        """commit the calling task's transaction and return its connection"""
+        session = self.__session__()
+        if session is None:
+            return
+
+        try:
+            await session.konnect.commit()
+            if self.verbose:
+                echo.info("Data Commit")
+
+        except SQLError as error:
+            echo.alert(error)
+
+        finally:
+            await self.__release__(session, force=True)
+
+    async def rollback(self):
+        """roll back the calling task's transaction and return its connection"""
+        session = self.__session__()
+        if session is None:
+            return
+
+        try:
+            await session.konnect.rollback()
+            if self.verbose:
+                echo.info("Rollback Successful")
+
+        except SQLError as error:
+            echo.alert(error)
+
+        finally:
+            await self.__release__(session, force=True)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """one transaction for the calling task and the tasks it starts
+           in the block; committed when the block ends, rolled back if it
+           raises. the tasks take turns on one connection, so await them
+           before the block ends.
+
+           USAGE:
+                async with db.transaction():
+                    await asyncio.gather(*(db.users.write(**row) for row in rows))
+        """
+        session = await self.__checkout__()
+        if session.pinned:
+            # already in a transaction; its commit() covers the block
+            yield self
+            return
+
+        session.pinned = True
+        token = self._shared.set(session)
+        try:
+            yield self
+
+        except BaseException:
+            with suppress(SQLError):
+                await session.konnect.rollback()
+            raise
+
+        else:
+            try:
+                await session.konnect.commit()
+
+            except SQLError as error:
+                echo.alert(error)
+
+        finally:
+            self._shared.reset(token)
+            await self.__release__(session, force=True)
+
+    async def closeall(self):
+        """return the calling task's connection and close the pool"""
+        if self.pool is None:
+            return
+
+        await self.__release__(force=True)
+        await self.pool.close()
+        self.pool = None
+        if self.verbose:
+            echo.info("Connection Pool Closed. Session Ended.")
+
+    @ BoundInnerClass
+    class Table:
+        """a table of the database; see MashaDB.Table. every database
+           call is a coroutine.
+        """
+
+        def __init__(self, outer, tablename):
+            self._name = tablename
+            self._db = outer
+            self.verbose = outer.verbose
+
+        def __repr__(self):
+            return f"{type(self).__name__}({self._name})"
+
+        def __str__(self):
+            return self._name
+
+        @ property
+        def rows(self):
+            """awaitable row count"""
+            return self.__count__()
+
+        @ pooled()
+        async def __count__(self):
+            rows, _ = await self._db.konnect.run(f"SELECT COUNT(*) FROM {self._name}")
+            return rows[0][0]
+
+        async def schema(self):
+            """cached column names, types, nullability and primary key"""
+            schema = self._db._schemas.get(self._name)
+            return schema if schema is not None else await self.__load_schema__()
+
+        @ pooled()
+        async def __load_schema__(self):
+            backend, konnect = self._db.backend, self._db.konnect
+            try:
+                description, _ = await konnect.run(backend.describe(self._name))
+                primary, _ = await konnect.run(backend.primary(self._name))
+
+            except SQLError as error:
+                echo.alert(error)
+            else:
+                schema = Schema.load(description, primary[0][0] if primary else 0)
+                self._db._schemas[self._name] = schema
+                return schema
+
+        @ pooled(write=True)
+        async def write(self, **kwargs):
+            """insert a row into the table; see MashaDB.Table.write"""
+            values = ('%s, ' * len(kwargs)).strip(', ')
+            statement = f"{self._db.backend.insert(self._name, kwargs, ignore=True)}({values})"
+            try:
+                _, count = await self._db.konnect.run(statement, tuple(kwargs.values()))
+                if self.verbose:
+                    echo.info(f"{count} record inserted into {self._name}")
+                return count
+
+            except SQLError as error:
+                echo.alert(error)
+
+        @ pooled(write=True)
+        async def write_many(self, rows, columns=None, batch_size=1000):
+            """insert dicts or tuples in multi-row INSERT statements of up
+               to batch_size rows and the server's max_allowed_packet.
+               returns the rows inserted by each batch.
+            """
+            rows = iter(rows)
+            first = next(rows, None)
+            if first is None:
+                return []
+
+            if columns is None:
+                columns = list(first.keys()) if isinstance(first, dict) else (await self.schema()).columns
+
+            head = self._db.backend.insert(self._name, columns, ignore=True)
+            row = f"({('%s, ' * len(columns)).strip(', ')})"
+            limit = self._db.backend.max_params
+            batch_size = max(1, min(batch_size, limit // len(columns))) if limit else batch_size
+            counts = []
+            try:
+                budget = await self._db.max_packet() - len(head) - 1024
+                for batch in MashaDB.Table.__batches__(chain((first,), rows), columns, batch_size, budget):
+                    _, count = await self._db.konnect.run(f"{head}{', '.join([row] * len(batch))}",
+                                                          tuple(chain.from_iterable(batch)))
+                    counts.append(count)
+
+                if self.verbose:
+                    echo.info(f"{sum(counts)} records inserted into {self._name} in {len(counts)} batch(es)")
+
+            except SQLError as error:
+                echo.alert(error)
+
+            return counts
+
+        @ pooled(write=True)
+        async def update(self, id, **kwargs):
+            """update columns of the row with primary key id"""
+            columns = f"{'=%s, '.join(kwargs.keys())}=%s"
+            try:
+                primary = (await self.schema()).primary
+                _, count = await self._db.konnect.run(f"UPDATE {self._name} SET {columns} WHERE {primary}=%s",
+                                                      (*kwargs.values(), id))
+                if self.verbose:
+                    echo.info(f"Updated Row: {id} Column(s): {', '.join(kwargs)}")
+                return count
+
+            except SQLError as error:
+                echo.alert(error)
+
+        @ pooled(write=True)
+        async def delete(self, id, value):
+            """delete the rows whose column id equals value"""
+            try:
+                _, count = await self._db.konnect.run(f"DELETE FROM {self._name} WHERE {id}=%s", (value,))
+                if self.verbose:
+                    echo.info(f"Deleted row {value} from {self._name}")
+                return count
+
+            except SQLError as error:
+                echo.alert(error)
+
+        @ pooled()
+        async def record_exists(self, column, data):
+            """boolean test for the existence of a record within the table"""
+            try:
+                rows, _ = await self._db.konnect.run(
+                    f"SELECT EXISTS(SELECT 1 FROM {self._name} WHERE {column}=%s LIMIT 1)", (data,))
+                return rows[0][0]
+
+            except SQLError as error:
+                echo.alert(error)
+
+        @ pooled()
+        async def distinct(self, column, count=False):
+            """distinct values of a column, or their number if count=True"""
+            try:
+                if count:
+                    rows, _ = await self._db.konnect.run(f"SELECT COUNT(DISTINCT {column}) FROM {self._name}")
+                    return rows[0][0]
+
+                rows, _ = await self._db.konnect.run(f"SELECT DISTINCT {column} FROM {self._name}")
+                return tuple(chain(*rows))
+
+            except SQLError as error:
+                echo.alert(error)
+
+        def select(self, *columns: str):
+            """create a Selector for the columns, or for every column"""
+            return self.Selector(columns)
+
+        @ BoundInnerClass
+        class Selector:
+            """selection of columns; see MashaDB.Table.Selector"""
+
+            def __init__(self, outer, columns):
+                self._name = outer._name
+                self._db = outer._db
+                self._table = outer
+                self.columns = ', '.join(columns) if columns else '*'
+
+            def __repr__(self):
+                return f"{self._name}.{type(self).__name__}({self.columns})"
+
+            def __aiter__(self):
+                return self.iter()
+
+            def __select__(self, condition=None, op='and', sort=None, limit=None, **kwargs):
+                """the statement and parameters of a selection"""
+                if condition:
+                    return f"SELECT {self.columns} FROM {self._name} WHERE {condition}".strip(), ()
+
+                if kwargs:
+                    return compose(self._name, self.columns, kwargs, op, sort, limit)
+
+                limit = f"LIMIT {limit}" if limit else ''
+                order = f"ORDER BY {sort}" if sort else ''
+                return f"SELECT {self.columns} FROM {self._name} {order} {limit}".strip(), ()
+
+            @ pooled()
+            async def __fetch__(self, query, params):
+                try:
+                    rows, _ = await self._db.konnect.run(query, params)
+                    return rows
+
+                except SQLError as error:
+                    echo.alert(error)
+
+            async def all(self, sort=None, limit=None):
+                """select all results of the selection"""
+                return await self.__fetch__(*self.__select__(sort=sort, limit=limit))
+
+            async def where(self, condition=None, op='and', sort=None, limit=None, **kwargs):
+                """filter the selection; takes the filters of MashaDB where()"""
+                return await self.__fetch__(*self.__select__(condition, op, sort, limit, **kwargs))
+
+            async def iter(self, chunk_size=1000, **kwargs):
+                """stream the selection one row at a time from an unbuffered
+                   cursor. keyword arguments are the filters of where(). the
+                   task's connection is busy until the iteration ends; close
+                   the generator, e.g. with contextlib.aclosing, to stop
+                   early.
+
+                   USAGE:
+                        async for row in db.users.select('email').iter(city='Berlin'):
+                            process(row)
+                """
+                query, params = self.__select__(**kwargs)
+                db = self._db
+                session = await db.__checkout__()
+                session.depth += 1
+                try:
+                    async for rows in session.konnect.stream(query, params, chunk_size):
+                        for row in rows:
+                            yield row
+
+                finally:
+                    session.depth -= 1
+                    if session.depth == 0:
+                        await db.__release__(session)
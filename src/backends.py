@@ -0,0 +1,452 @@
+"""database backends for MashaDB
+
+   a backend opens connections and connection pools and supplies the
+   statements that differ between SQL dialects: listing and describing
+   tables, finding the primary key, INSERT IGNORE, upserts and limited
+   deletes. everything else MashaDB sends is portable SQL written with
+   %s placeholders.
+
+   Backend talks to MariaDB and MySQL through mysql.connector and is the
+   default. SQLite runs the same Table and Selector API on the sqlite3
+   module from the standard library, on a database file or in memory.
+
+   USAGE:
+        db = MashaDB(**config)
+        db = MashaDB(backend='sqlite', database='app.db')
+        db = MashaDB(backend='sqlite')                      in memory
+"""
+import re
+import sqlite3
+import threading
+import unicodedata
+from itertools import chain, count, islice
+from functools import lru_cache
+
+import mysql.connector as engine
+from mysql.connector import pooling
+from mysql.connector import Error as SQLError
+
+# connector 9.2 replaced execute(multi=True) with multi statement
+# execute() and nextset()
+MULTI = tuple(engine.__version_info__[:2]) < (9, 2)
+
+
+class Backend:
+    """MariaDB and MySQL through mysql.connector"""
+    name = 'mysql'
+    defaults = {}
+    # placeholders allowed in one statement; None means no limit
+    max_params = None
+    local_infile = True
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+    @classmethod
+    def create(cls, option):
+        """build a backend from the MashaDB backend argument"""
+        if option is None:
+            return cls()
+
+        if isinstance(option, Backend):
+            return option
+
+        if isinstance(option, type) and issubclass(option, Backend):
+            return option()
+
+        try:
+            return BACKENDS[option.lower()]()
+
+        except KeyError:
+            raise ValueError(f"backend must be one of {', '.join(BACKENDS)}") from None
+
+    def connect(self, config):
+        """open a connection"""
+        return engine.connect(**config)
+
+    def collate(self, value):
+        """the sort key of a string under the default collation of the
+           server, utf8mb4_0900_ai_ci, which ignores case and accents.
+        """
+        return ''.join(char for char in unicodedata.normalize('NFKD', value)
+                       if not unicodedata.combining(char)).casefold()
+
+    def pool_limit(self, config):
+        """the most connections that can work on the database at once,
+           or None for no limit.
+        """
+        return None
+
+    def pool(self, size, config):
+        """open a pool of size connections"""
+        # sessions are not reset on return so prepared statements survive;
+        # __release__ rolls back instead to end the read snapshot.
+        return pooling.MySQLConnectionPool(pool_size=size, **{'pool_reset_session': False, **config})
+
+    def close_pool(self, pool):
+        """close the idle connections of a pool"""
+        pool._remove_connections()
+
+    def close(self):
+        """release what the backend holds once MashaDB is closed"""
+
+    def unwrap(self, konnect):
+        """the connection behind a pooled connection wrapper, which is
+           discarded when it returns to the pool.
+        """
+        return konnect._cnx if isinstance(konnect, pooling.PooledMySQLConnection) else konnect
+
+    def databases(self):
+        return 'SHOW DATABASES'
+
+    def tables(self):
+        return 'SHOW TABLES'
+
+    def table_exists(self, table):
+        return f"SHOW TABLES LIKE '{table}'"
+
+    def describe(self, table):
+        """rows of Field, Type, Null, Key, Default and Extra"""
+        return f"DESC {table}"
+
+    def primary(self, table):
+        return (f"SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                f"WHERE TABLE_NAME='{table}' AND CONSTRAINT_NAME='PRIMARY'")
+
+    def max_packet(self):
+        return 'SELECT @@max_allowed_packet'
+
+    def column(self, name, datatype):
+        """a column definition of CREATE TABLE"""
+        if datatype.endswith('PRIMARY KEY'):
+            return f"{name} {datatype}({name})"
+
+        return f"{name} {datatype}"
+
+    def insert(self, table, columns, ignore=False):
+        """the head of an INSERT statement, up to VALUES"""
+        return f"INSERT {'IGNORE ' if ignore else ''}INTO {table} ({', '.join(columns)}) VALUES "
+
+    def add_column(self, table, column, datatype, location='last'):
+        """an ALTER TABLE statement adding a column at location: 'first',
+           'last' or 'after column'
+        """
+        position = '' if location.strip().lower() == 'last' else f" {location}"
+        return f"ALTER TABLE {table} ADD COLUMN {column} {datatype}{position}"
+
+    def upsert(self, keys, update):
+        """the tail of an INSERT statement that updates colliding rows"""
+        return f" ON DUPLICATE KEY UPDATE {', '.join(f'{column}=VALUES({column})' for column in update)}"
+
+    def delete(self, table, where, limit=None):
+        return f"DELETE FROM {table} WHERE {where}{f' LIMIT {int(limit)}' if limit else ''}"
+
+    def locked_rename(self, version):
+        """whether RENAME TABLE runs on tables locked with LOCK TABLES,
+           which MySQL allows from 8.0.13 and MariaDB does not.
+        """
+        if 'mariadb' in version.lower():
+            return False
+
+        numbers = re.match(r'(\d+)\.(\d+)\.(\d+)', version)
+        return numbers is not None and tuple(map(int, numbers.groups())) >= (8, 0, 13)
+
+    def pipeline(self, kursor, statements):
+        """run (statement, params) pairs in one round trip as a multi
+           statement query. yields the fetched rows of each statement
+           that returns rows and the row count of any other.
+        """
+        query = ';\n'.join(statement for statement, _ in statements)
+        params = tuple(chain.from_iterable(params for _, params in statements))
+        if MULTI:
+            for result in kursor.execute(query, params, multi=True):
+                yield result.fetchall() if result.with_rows else result.rowcount
+            return
+
+        kursor.execute(query, params)
+        yield kursor.fetchall() if kursor.with_rows else kursor.rowcount
+        while kursor.nextset():
+            yield kursor.fetchall() if kursor.with_rows else kursor.rowcount
+
+
+class SQLite(Backend):
+    """sqlite3 from the standard library. connect with database set to a
+       file path, or to ':memory:' or nothing for an in-memory database
+       that lives until the MashaDB object is closed. pooled mode needs a
+       database file.
+    """
+    name = 'sqlite'
+    defaults = {'database': ':memory:'}
+    max_params = 32766
+    local_infile = False
+    memories = count()
+
+    def __init__(self):
+        self.memory = None
+        self.keeper = None
+
+    def __address__(self, config):
+        """the database file, or a shared in-memory database that every
+           connection of this backend can reach.
+        """
+        database = config.get('database') or ':memory:'
+        if database != ':memory:':
+            return database, False
+
+        if self.memory is None:
+            self.memory = f"file:masha-memory-{next(self.memories)}?mode=memory&cache=shared"
+            self.keeper = sqlite3.connect(self.memory, uri=True, check_same_thread=False)
+
+        return self.memory, True
+
+    def connect(self, config):
+        address, uri = self.__address__(config)
+        options = {key: config[key] for key in ('timeout',) if key in config}
+        try:
+            return Connection(sqlite3.connect(address, uri=uri, check_same_thread=False, **options))
+
+        except sqlite3.Error as error:
+            raise SQLError(msg=str(error)) from error
+
+    def collate(self, value):
+        # BINARY collation: code point order, as python compares strings
+        return value
+
+    def pool_limit(self, config):
+        # connections to a shared cache in-memory database fail at once with
+        # SQLITE_LOCKED while another writes, regardless of timeout.
+        return 1 if (config.get('database') or ':memory:') == ':memory:' else None
+
+    def pool(self, size, config):
+        return Pool(self, size, config)
+
+    def close_pool(self, pool):
+        pool.close()
+
+    def close(self):
+        if self.keeper is not None:
+            self.keeper.close()
+            self.memory = self.keeper = None
+
+    def unwrap(self, konnect):
+        return konnect._cnx if isinstance(konnect, Pooled) else konnect
+
+    def databases(self):
+        return 'SELECT name FROM pragma_database_list'
+
+    def tables(self):
+        return "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+
+    def table_exists(self, table):
+        return f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table}'"
+
+    def describe(self, table):
+        return (f"SELECT name, type, CASE WHEN \"notnull\" OR pk THEN 'NO' ELSE 'YES' END, "
+                f"CASE WHEN pk THEN 'PRI' ELSE '' END, dflt_value, '' FROM pragma_table_info('{table}')")
+
+    def primary(self, table):
+        return f"SELECT name FROM pragma_table_info('{table}') WHERE pk ORDER BY pk"
+
+    def max_packet(self):
+        return 'SELECT 1000000000'
+
+    def column(self, name, datatype):
+        datatype = re.sub(r'\bINT(EGER)?\s+(NOT NULL\s+)?AUTO_INCREMENT\s*,?\s*PRIMARY KEY',
+                          'INTEGER PRIMARY KEY AUTOINCREMENT', datatype, flags=re.I)
+        datatype = re.sub(r'\s*AUTO_INCREMENT(=\d+)?', '', datatype, flags=re.I)
+        return f"{name} {datatype.strip()}"
+
+    def insert(self, table, columns, ignore=False):
+        return f"INSERT {'OR IGNORE ' if ignore else ''}INTO {table} ({', '.join(columns)}) VALUES "
+
+    def add_column(self, table, column, datatype, location='last'):
+        # sqlite only appends columns and would read a position as part
+        # of the type.
+        if location.strip().lower() != 'last':
+            raise ValueError(f"the {self.name} backend adds columns last; location must be 'last'")
+
+        return f"ALTER TABLE {table} ADD COLUMN {self.column(column, datatype)}"
+
+    def upsert(self, keys, update):
+        return f" ON CONFLICT({', '.join(keys)}) DO UPDATE SET {', '.join(f'{column}=excluded.{column}' for column in update)}"
+
+    def delete(self, table, where, limit=None):
+        if not limit:
+            return super().delete(table, where)
+
+        return f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT {int(limit)})"
+
+    def pipeline(self, kursor, statements):
+        # sqlite runs in process, there is no round trip to save.
+        for statement, params in statements:
+            kursor.execute(statement, params)
+            yield kursor.fetchall() if kursor.with_rows else kursor.rowcount
+
+
+BACKENDS = {'mysql': Backend, 'mariadb': Backend, 'sqlite': SQLite}
+
+
+# quoted literals and identifiers, which are kept as they are, and the
+# %s placeholders and %% escapes between them. sqlite escapes a quote by
+# doubling it, which reads as two adjacent literals here.
+TOKENS = re.compile(r"""'[^']*'|"[^"]*"|`[^`]*`|%[s%]""")
+REWRITES = {'%s': '?', '%%': '%'}
+
+
+@lru_cache(maxsize=1024)
+def placeholders(statement):
+    """rewrite %s placeholders as ? and %% as %, outside quoted literals"""
+    return TOKENS.sub(lambda match: REWRITES.get(match.group(), match.group()), statement)
+
+
+class Cursor:
+    """sqlite3 cursor with the mysql.connector cursor interface. a buffered
+       cursor reads the whole result in execute() and reports its length
+       as rowcount, as buffered mysql.connector cursors do.
+    """
+
+    def __init__(self, konnect, buffered=False):
+        self._konnect = konnect
+        self._kursor = konnect._db.cursor()
+        self._buffered = buffered
+        self._rows = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+        self.warning_count = 0
+
+    @property
+    def with_rows(self):
+        return self.description is not None
+
+    def __iter__(self):
+        return iter(self._kursor if self._rows is None else self._rows)
+
+    def execute(self, statement, params=(), *args, **kwargs):
+        statement = placeholders(statement.strip())
+        try:
+            # a savepoint outside of a transaction would start one that
+            # commits when the savepoint is released.
+            if statement[:9].upper() == 'SAVEPOINT' and not self._konnect._db.in_transaction:
+                self._kursor.execute('BEGIN')
+            self._kursor.execute(statement, tuple(params or ()))
+            rows = self._kursor.fetchall() if self._buffered and self._kursor.description else None
+
+        except sqlite3.Error as error:
+            raise SQLError(msg=str(error)) from error
+
+        self.description = self._kursor.description
+        self.rowcount = self._kursor.rowcount if rows is None else len(rows)
+        self.lastrowid = self._kursor.lastrowid
+        self._rows = None if rows is None else iter(rows)
+
+    def executemany(self, statement, rows):
+        try:
+            self._kursor.executemany(placeholders(statement.strip()), [tuple(row) for row in rows])
+
+        except sqlite3.Error as error:
+            raise SQLError(msg=str(error)) from error
+
+        self.description = None
+        self.rowcount = self._kursor.rowcount
+        self._rows = None
+
+    def fetchall(self):
+        return self._kursor.fetchall() if self._rows is None else list(self._rows)
+
+    def fetchmany(self, size=1):
+        return self._kursor.fetchmany(size) if self._rows is None else list(islice(self._rows, size))
+
+    def fetchone(self):
+        return self._kursor.fetchone() if self._rows is None else next(self._rows, None)
+
+    def close(self):
+        self._kursor.close()
+        return True
+
+
+class Connection:
+    """sqlite3 connection with the mysql.connector connection interface.
+       sqlite results never block the connection, so there is never an
+       unread result to consume.
+    """
+    unread_result = False
+
+    def __init__(self, db):
+        self._db = db
+        self._open = True
+
+    def cursor(self, *args, buffered=False, **kwargs):
+        return Cursor(self, buffered)
+
+    def consume_results(self):
+        pass
+
+    def get_server_info(self):
+        return f"SQLite {sqlite3.sqlite_version}"
+
+    def is_connected(self):
+        return self._open
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def close(self):
+        if self._open:
+            self._db.close()
+            self._open = False
+
+
+class Pooled:
+    """a connection checked out of a Pool; close() returns it"""
+
+    def __init__(self, pool, konnect):
+        self._pool = pool
+        self._cnx = konnect
+
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+
+    def close(self):
+        konnect, self._cnx = self._cnx, None
+        self._pool.__return__(konnect)
+
+
+class Pool:
+    """fixed size pool of sqlite connections to one database"""
+
+    def __init__(self, backend, size, config):
+        self.backend = backend
+        self.config = config
+        self.size = size
+        self.idle = []
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def get_connection(self):
+        with self.lock:
+            if self.idle:
+                return Pooled(self, self.idle.pop())
+
+            if self.opened >= self.size:
+                raise SQLError(msg='Failed getting connection; pool exhausted')
+
+            self.opened += 1
+
+        return Pooled(self, self.backend.connect(self.config))
+
+    def __return__(self, konnect):
+        konnect.rollback()
+        with self.lock:
+            self.idle.append(konnect)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+            self.opened -= len(idle)
+
+        for konnect in idle:
+            konnect.close()
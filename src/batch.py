@@ -0,0 +1,159 @@
+"""bounded transactions for long running write jobs
+
+   inside db.batch() the write operations of the calling thread are
+   grouped into transactions that are committed every commit_every
+   operations or every commit_interval seconds, whichever comes first.
+   a statement that fails inside a write operation rolls back the batch
+   it belongs to; batches committed before it stay committed and the
+   job carries on with a new batch. an exception that leaves the with
+   block rolls back the open batch only and is raised again.
+
+   every finished batch is recorded with its size, duration and
+   throughput and passed to the optional report callback.
+
+   USAGE:
+        with db.batch(commit_every=5000, commit_interval=2.0) as batch:
+            for row in rows:
+                db.events.write(**row)
+
+        batch.batches[-1]
+        {'batch': 12, 'operations': 5000, 'rows': 5000, 'seconds': 0.41, ...}
+"""
+import time
+
+from mysql.connector import Error as SQLError
+
+from src.utilities import echo
+
+
+class Batch:
+    """the open batch of one thread; created by MashaDB.batch()"""
+
+    def __init__(self, db, commit_every=1000, commit_interval=None, report=None):
+        self.db = db
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.report = report
+        self.batches = []
+        self.depth = 0
+        self.__reset__()
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(commit_every={self.commit_every}, commit_interval={self.commit_interval}, "
+                f"batches={len(self.batches)}, open={self.operations})")
+
+    def __reset__(self):
+        self.operations = 0
+        self.rows = 0
+        self.error = None
+        self.started = time.perf_counter()
+
+    def __track__(self, run, *args, **kwargs):
+        """run a write operation as part of the open batch"""
+        self.depth += 1
+        try:
+            result = run(*args, **kwargs)
+
+        finally:
+            self.depth -= 1
+
+        if not self.depth:
+            self.operations += 1
+            self.rows += self.__affected__(result) if self.error is None else 0
+            self.__tick__()
+
+        return result
+
+    def __affected__(self, result):
+        """rows written by an operation, from its result or its cursor"""
+        if isinstance(result, int) and not isinstance(result, bool):
+            return result
+
+        if isinstance(result, list):
+            return sum(result)
+
+        if isinstance(result, dict):
+            return result.get('loaded', 0)
+
+        db = self.db
+        kursor = db._kursor if db.pool is None else getattr(db._local, 'kursor', None)
+        return max(getattr(kursor, 'rowcount', 0) or 0, 0)
+
+    def __failed__(self, error):
+        """record a statement that failed inside a write operation"""
+        if self.depth and self.error is None:
+            self.error = error
+
+    def __tick__(self):
+        if self.error is not None:
+            self.end(commit=False)
+
+        elif self.operations >= self.commit_every:
+            self.end()
+
+        elif self.commit_interval is not None and time.perf_counter() - self.started >= self.commit_interval:
+            self.end()
+
+    def end(self, commit=True):
+        """commit or roll back the open batch and start a new one"""
+        if not self.operations:
+            self.__reset__()
+            return
+
+        db, error = self.db, self.error
+        try:
+            if commit and error is None:
+                db.konnect.commit()
+                db.__settled__()
+            else:
+                db.konnect.rollback()
+                db.__invalidate__(schema=False)
+                db.__settled__(committed=False)
+
+        except SQLError as failure:
+            error = error or failure
+            db.konnect.rollback()
+            db.__invalidate__(schema=False)
+            db.__settled__(committed=False)
+
+        finally:
+            if db.pool is not None:
+                db.__release__(force=True)
+
+        seconds = time.perf_counter() - self.started
+        committed = commit and error is None
+        result = {
+            'batch': len(self.batches) + 1,
+            'operations': self.operations,
+            'rows': self.rows,
+            'seconds': round(seconds, 6),
+            'ops_per_sec': round(self.operations / seconds, 1) if seconds else None,
+            'rows_per_sec': round(self.rows / seconds, 1) if seconds else None,
+            'committed': committed,
+            'error': None if error is None else str(error),
+        }
+        self.batches.append(result)
+        if db.verbose:
+            state = 'committed' if committed else f"rolled back ({result['error'] or 'aborted'})"
+            echo.info(f"Batch {result['batch']}: {self.operations} operation(s), {self.rows} row(s) "
+                      f"{state} in {seconds:.3f}s, {result['ops_per_sec']} ops/s")
+
+        if self.report is not None:
+            self.report(result)
+
+        self.__reset__()
+
+    def summary(self):
+        """totals over every finished batch"""
+        committed = [batch for batch in self.batches if batch['committed']]
+        seconds = sum(batch['seconds'] for batch in self.batches)
+        rows = sum(batch['rows'] for batch in committed)
+        return {
+            'batches': len(self.batches),
+            'committed': len(committed),
+            'rolled_back': len(self.batches) - len(committed),
+            'operations': sum(batch['operations'] for batch in committed),
+            'rows': rows,
+            'seconds': round(seconds, 6),
+            'rows_per_sec': round(rows / seconds, 1) if seconds else None,
+        }
@@ -0,0 +1,204 @@
+"""caches used by the MashaDB connection objects"""
+import time
+import threading
+from collections import OrderedDict, defaultdict
+
+
+class StatementCache:
+    """least recently used cache of prepared cursors for one connection.
+
+       each prepared cursor holds a single server side statement, so the
+       cache maps a statement shape (the SQL text with %s placeholders)
+       to the cursor that prepared it. executing a cached shape again
+       only sends the parameters; the server skips parsing and planning.
+       the least recently used statement is closed when the cache is full.
+
+       results come back through the binary protocol, which mysql-connector
+       8.0 decodes differently from plain queries; MashaDB only uses the
+       cache when it is created with a statement_cache.
+
+       USAGE:
+            statements = StatementCache(konnect, maxsize=64)
+            kursor = statements.execute('SELECT * FROM users WHERE id=%s', (1,))
+            rows = kursor.fetchall()
+    """
+
+    def __init__(self, konnect, maxsize=64, cursor=None):
+        self.konnect = konnect
+        self.maxsize = maxsize
+        self.cursor = cursor
+        self.cursors = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.cursors)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(size={len(self)}, maxsize={self.maxsize}, hits={self.hits}, misses={self.misses})"
+
+    def execute(self, statement, params=()):
+        """execute statement on its cached prepared cursor, returns the cursor"""
+        try:
+            statement, kursor = self.cursors[statement]
+            self.cursors.move_to_end(statement)
+            self.hits += 1
+
+        except KeyError:
+            self.misses += 1
+            kursor = self.cursor(self.konnect, prepared=True) if self.cursor else self.konnect.cursor(prepared=True)
+            self.cursors[statement] = (statement, kursor)
+            if len(self.cursors) > self.maxsize:
+                _, (_, evicted) = self.cursors.popitem(last=False)
+                evicted.close()
+
+        # the prepared cursor compares statements by identity, so the
+        # cached string is passed back to reuse the server side statement.
+        kursor.execute(statement, tuple(params))
+        return kursor
+
+    def clear(self):
+        """drop every cached statement"""
+        for _, kursor in self.cursors.values():
+            kursor.close()
+
+        self.cursors.clear()
+
+
+class QueryCache:
+    """bounded cache of SELECT results with LRU eviction and per entry TTL.
+
+       entries are indexed by table. writes and DDL on a table invalidate
+       every entry read from it, and a result fetched while its table was
+       being invalidated is discarded instead of stored. the cache holds at
+       most maxsize results and max_rows rows; results larger than max_rows
+       are never cached.
+
+       USAGE:
+            db = MashaDB(query_cache=QueryCache(maxsize=512, ttl=60), **config)
+            db = MashaDB(query_cache={'maxsize': 512, 'ttl': 60}, **config)
+            db = MashaDB(query_cache=512, **config)
+
+            db.query_cache.info()
+            {'hits': 10, 'misses': 2, 'evictions': 0, 'expired': 0, ...}
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, max_rows=1_000_000):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.entries = OrderedDict()
+        self.tables = defaultdict(set)
+        self.generations = defaultdict(int)
+        self.epoch = 0
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v}' for k, v in self.info().items())})"
+
+    @classmethod
+    def create(cls, option):
+        """build a cache from the MashaDB query_cache argument"""
+        if option is None or option is False:
+            return None
+
+        if isinstance(option, cls):
+            return option
+
+        if option is True:
+            return cls()
+
+        if isinstance(option, dict):
+            return cls(**option)
+
+        return cls(maxsize=int(option))
+
+    def info(self):
+        """returns the hit, miss and size counters"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expired': self.expired,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'rows': self.rows,
+            'max_rows': self.max_rows,
+        }
+
+    def generation(self, table):
+        """the invalidation counter of a table; pass it to put()"""
+        return self.epoch, self.generations[table]
+
+    def get(self, key):
+        """returns the cached rows for key, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            table, rows, expires = entry
+            if expires is not None and expires < time.monotonic():
+                self.__discard__(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return rows
+
+    def put(self, table, key, rows, generation=None, ttl=None):
+        """cache rows read from table. skipped when the table has been
+           invalidated since generation was taken.
+        """
+        rows = tuple(rows)
+        ttl = self.ttl if ttl is None else ttl
+        with self.lock:
+            if len(rows) > self.max_rows:
+                return
+
+            if generation is not None and generation != self.generation(table):
+                return
+
+            if key in self.entries:
+                self.__discard__(key)
+
+            expires = time.monotonic() + ttl if ttl else None
+            self.entries[key] = (table, rows, expires)
+            self.tables[table].add(key)
+            self.rows += len(rows)
+            while len(self.entries) > self.maxsize or self.rows > self.max_rows:
+                self.__discard__(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tables):
+        """drop every entry read from the named tables"""
+        with self.lock:
+            for table in tables:
+                self.generations[table] += 1
+                for key in list(self.tables.get(table, ())):
+                    self.__discard__(key)
+                self.tables.pop(table, None)
+
+    def clear(self):
+        """drop every entry"""
+        with self.lock:
+            self.epoch += 1
+            self.entries.clear()
+            self.tables.clear()
+            self.rows = 0
+
+    def __discard__(self, key):
+        table, rows, _ = self.entries.pop(key)
+        self.tables[table].discard(key)
+        self.rows -= len(rows)
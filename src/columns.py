@@ -1,5 +1,40 @@
+import re
 from dataclasses import dataclass
 
+INTEGERS = ('tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint', 'year', 'bit')
+FLOATS = ('float', 'double', 'real', 'decimal', 'numeric')
+BINARIES = ('binary', 'varbinary', 'tinyblob', 'blob', 'mediumblob', 'longblob')
+TEMPORALS = {'date': 'M8[D]', 'datetime': 'M8[us]', 'timestamp': 'M8[us]', 'time': 'm8[us]'}
+
+
+def numpy_type(datatype, null=False):
+    """map a MySQL column type to a numpy dtype string.
+
+       nullable integers become floats so NULL can be stored as nan.
+       strings and binaries without a declared size map to 'U' and 'S',
+       which the caller sizes before allocating an array.
+
+       USAGE:
+           numpy_type('varchar(40)')      'U40'
+           numpy_type('int(11)', True)    'f8'
+    """
+    datatype = datatype.decode() if isinstance(datatype, bytes) else datatype
+    match = re.match(r'(\w+)(?:\((\d+))?', datatype.lower())
+    base, size = match.group(1), match.group(2)
+    if base in INTEGERS:
+        return 'f8' if null else 'i8'
+
+    if base in FLOATS:
+        return 'f8'
+
+    if base in TEMPORALS:
+        return TEMPORALS[base]
+
+    if base in BINARIES:
+        return f"S{size}" if size and base.endswith('binary') else 'S'
+
+    return f"U{size}" if size and base.endswith('char') else 'U'
+
 
 @dataclass
 class Column:
@@ -22,3 +57,29 @@ class Primary:
     def key(self):
         init = f'AUTO_INCREMENT={self.init}' if self.init else 'AUTO_INCREMENT'
         return f'INT NOT NULL {init}, PRIMARY KEY'
+
+
+@dataclass(frozen=True)
+class Schema:
+    description: tuple
+    primary: str = 0
+
+    @classmethod
+    def load(cls, description, primary=0):
+        return cls(tuple(description), primary)
+
+    @property
+    def columns(self):
+        return [row[0] for row in self.description]
+
+    @property
+    def types(self):
+        return {row[0]: row[1] for row in self.description}
+
+    @property
+    def null(self):
+        return {row[0]: row[2] == 'YES' for row in self.description}
+
+    @property
+    def dtypes(self):
+        return {row[0]: numpy_type(row[1], row[2] == 'YES') for row in self.description}
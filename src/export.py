@@ -0,0 +1,296 @@
+"""parallel partitioned export of a table to csv, parquet or npy files
+
+   the table is split into primary key ranges and each range is read over
+   its own connection by a worker thread. rows are streamed from an
+   unbuffered cursor chunk_size rows at a time and appended to one part
+   file per range, so memory use is bounded by the chunk size. the parts
+   are merged into a single file or kept as a partitioned directory.
+
+   pyarrow is required for parquet and numpy for npy; both are imported
+   only when that format is requested.
+
+   USAGE:
+        db.users.export('users.csv', workers=8)
+        db.users.export('users', format='parquet', workers=8, merge=False)
+"""
+import csv
+import time
+import shutil
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from src.columns import numpy_type
+
+FORMATS = ('csv', 'parquet', 'npy')
+
+
+def ranges(low, high, parts):
+    """split the closed interval [low, high] into parts half open ranges"""
+    if low is None or high is None:
+        return []
+
+    parts = max(1, min(parts, high - low + 1))
+    step = (high - low + 1) / parts
+    bounds = [low + round(step * index) for index in range(parts)] + [high + 1]
+    return list(zip(bounds, bounds[1:]))
+
+
+class CsvPart:
+    def __init__(self, path, columns, header=True, **kwargs):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        if header:
+            self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        return len(rows)
+
+    def close(self):
+        self.file.close()
+
+    @staticmethod
+    def merge(parts, path, columns):
+        with open(path, 'w', newline='') as output:
+            csv.writer(output).writerow(columns)
+            for part in parts:
+                with open(part, newline='') as source:
+                    shutil.copyfileobj(source, output)
+
+
+class ParquetPart:
+    def __init__(self, path, columns, types=None, **kwargs):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.columns = columns
+        self.schema = pa.schema([(column, arrow_type(pa, types[column])) for column in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        arrays = [self.pa.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        return len(rows)
+
+    def close(self):
+        self.writer.close()
+
+    @staticmethod
+    def merge(parts, path, columns):
+        import pyarrow.parquet as pq
+
+        writer = None
+        for part in parts:
+            source = pq.ParquetFile(part)
+            if writer is None:
+                writer = pq.ParquetWriter(path, source.schema_arrow)
+            for group in range(source.num_row_groups):
+                writer.write_table(source.read_row_group(group))
+
+        if writer is not None:
+            writer.close()
+
+
+class NpyPart:
+    def __init__(self, path, columns, dtype=None, count=0, **kwargs):
+        import numpy as np
+        from numpy.lib.format import open_memmap
+
+        self.np = np
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.fills = [fill(self.dtype[column]) for column in columns]
+        self.array = open_memmap(path, mode='w+', dtype=self.dtype, shape=(count,))
+        self.offset = 0
+
+    def write(self, rows):
+        """write rows into the reserved array, returns the number written.
+           rows inserted since the partition was counted are left out.
+        """
+        fills = self.fills
+        rows = [tuple(blank if value is None else value for value, blank in zip(row, fills)) for row in rows]
+        rows = rows[:len(self.array) - self.offset]
+        self.array[self.offset:self.offset + len(rows)] = self.np.array(rows, dtype=self.dtype)
+        self.offset += len(rows)
+        return len(rows)
+
+    def close(self):
+        """flush the part; trims the rows reserved for rows deleted since
+           the partition was counted.
+        """
+        self.array.flush()
+        if self.offset < len(self.array):
+            rows = self.np.array(self.array[:self.offset])
+            del self.array
+            self.np.save(self.path, rows)
+        else:
+            del self.array
+
+    @staticmethod
+    def merge(parts, path, columns):
+        import numpy as np
+        from numpy.lib.format import open_memmap
+
+        arrays = [np.load(part, mmap_mode='r') for part in parts]
+        output = open_memmap(path, mode='w+', dtype=arrays[0].dtype, shape=(sum(map(len, arrays)),))
+        offset = 0
+        for array in arrays:
+            output[offset:offset + len(array)] = array
+            offset += len(array)
+
+        output.flush()
+        del output, arrays
+
+
+WRITERS = {'csv': CsvPart, 'parquet': ParquetPart, 'npy': NpyPart}
+
+
+def fill(dtype):
+    """the value stored in place of NULL for a numpy field"""
+    return {'U': '', 'S': b'', 'b': False, 'M': 'NaT', 'm': 'NaT'}.get(dtype.kind, float('nan'))
+
+
+def arrow_type(pa, datatype):
+    """map a MySQL column type to a pyarrow type"""
+    datatype = (datatype.decode() if isinstance(datatype, bytes) else datatype).lower()
+    base = datatype.split('(')[0].split()[0]
+    if base in ('decimal', 'numeric') and '(' in datatype:
+        precision, _, scale = datatype.split('(')[1].rstrip(')').partition(',')
+        return pa.decimal128(int(precision), int(scale or 0))
+
+    kind = numpy_type(datatype)
+    types = {'i8': pa.int64(), 'f8': pa.float64(), 'M8[D]': pa.date32(),
+             'M8[us]': pa.timestamp('us'), 'm8[us]': pa.duration('us')}
+    if kind in types:
+        return types[kind]
+
+    return pa.binary() if kind.startswith('S') else pa.string()
+
+
+class Exporter:
+    """export one table; created and run by Table.export()"""
+
+    def __init__(self, table, path, format='csv', workers=4, columns=None,
+                 chunk_size=10000, merge=True, partitions=None):
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+
+        table._db.__concurrent__('export')
+        self.table = table
+        self.db = table._db
+        self.path = Path(path)
+        self.format = format
+        self.workers = max(1, workers)
+        self.columns = list(columns or table.columns)
+        self.chunk_size = chunk_size
+        self.merge = merge
+        self.partitions = partitions or self.workers * 4
+        self.directory = self.path.with_name(f"{self.path.name}.parts") if merge else self.path
+        self.key = self.__key__()
+        self.dtype = self.__dtype__() if format == 'npy' else None
+
+    def __key__(self):
+        """the integer primary key used to partition the table, or None"""
+        schema = self.table.schema
+        key = schema.primary
+        return key if key and numpy_type(schema.types[key]) == 'i8' else None
+
+    def __dtype__(self):
+        """numpy record dtype; unsized strings are sized by the longest value"""
+        dtypes = self.table.schema.dtypes
+        dtype = [(column, dtypes.get(column, 'U')) for column in self.columns]
+        unsized = [column for column, kind in dtype if kind in ('U', 'S')]
+        if not unsized:
+            return dtype
+
+        konnect = self.db.__connection__()
+        try:
+            kursor = self.db.__cursor__(konnect, buffered=True)
+            lengths = ', '.join(f"MAX(LENGTH({column}))" for column in unsized)
+            kursor.execute(f"SELECT {lengths} FROM {self.table._name}")
+            sizes = dict(zip(unsized, kursor.fetchone()))
+
+        finally:
+            konnect.close()
+
+        return [(column, f"{kind}{sizes[column] or 1}" if column in sizes else kind) for column, kind in dtype]
+
+    def __bounds__(self):
+        if self.key is None:
+            return [None]
+
+        konnect = self.db.__connection__()
+        try:
+            kursor = self.db.__cursor__(konnect, buffered=True)
+            kursor.execute(f"SELECT MIN({self.key}), MAX({self.key}) FROM {self.table._name}")
+            low, high = kursor.fetchone()
+
+        finally:
+            konnect.close()
+
+        return ranges(low, high, self.partitions) or [None]
+
+    def run(self):
+        """export every partition, returns a summary of the export"""
+        start = time.perf_counter()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        bounds = self.__bounds__()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(self.partition, range(len(bounds)), bounds))
+
+        parts = [part for part, rows in results]
+        rows = sum(rows for part, rows in results)
+        if self.merge:
+            WRITERS[self.format].merge(parts, self.path, self.columns)
+            shutil.rmtree(self.directory)
+            files = [str(self.path)]
+        else:
+            files = [str(part) for part in parts]
+
+        return {'path': str(self.path), 'format': self.format, 'rows': rows, 'files': files,
+                'partitions': len(bounds), 'seconds': round(time.perf_counter() - start, 3)}
+
+    def partition(self, index, bounds):
+        """stream one key range to its part file over a dedicated connection"""
+        name = self.table._name
+        where, order, params = '', '', ()
+        if bounds is not None:
+            where = f" WHERE {self.key} >= %s AND {self.key} < %s"
+            order = f" ORDER BY {self.key}"
+            params = bounds
+
+        part = self.directory / f"part-{index:05d}.{self.format}"
+        konnect = self.db.__connection__()
+        try:
+            count = 0
+            if self.format == 'npy':
+                kursor = self.db.__cursor__(konnect, buffered=True)
+                kursor.execute(f"SELECT COUNT(*) FROM {name}{where}", params)
+                count = kursor.fetchone()[0]
+                kursor.close()
+
+            writer = WRITERS[self.format](part, self.columns, header=not self.merge, count=count,
+                                          dtype=self.dtype, types=self.table.schema.types)
+            kursor = self.db.__cursor__(konnect, buffered=False)
+            rows = 0
+            try:
+                kursor.execute(f"SELECT {', '.join(self.columns)} FROM {name}{where}{order}", params)
+                chunk = kursor.fetchmany(self.chunk_size)
+                while chunk:
+                    rows += writer.write(chunk)
+                    chunk = kursor.fetchmany(self.chunk_size)
+
+            finally:
+                writer.close()
+                kursor.close()
+
+        finally:
+            konnect.close()
+
+        return part, rows
+
+    def cleanup(self):
+        """remove part files left behind by a failed merged export"""
+        if self.merge and self.directory.exists():
+            shutil.rmtree(self.directory)
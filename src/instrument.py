@@ -0,0 +1,364 @@
+"""statement timing, query hooks, slow query log and per table statistics
+
+   every cursor handed out by MashaDB is wrapped in a Cursor that times
+   execute() and executemany() and counts the rows and bytes fetched from
+   it. with instrumentation off the wrapper only forwards calls. with it
+   on, each statement produces an Event when it ends: right after execute
+   for writes, or once its result has been read to the end, the cursor
+   runs another statement or is closed for reads. the statements of a
+   multi statement execute() are recorded one by one as their results
+   are read. events are passed to the registered hooks, logged when
+   slower than the slow query threshold and aggregated into latency
+   histograms per operation and per table.
+
+   bytes fetched are estimated from the fetched values: the length of
+   strings and binaries and eight bytes for any other value.
+
+   USAGE:
+        db = MashaDB(instrument={'slow_query': 0.5}, **config)
+        db.on_query(lambda event: print(event.operation, event.ms))
+        db.stats()['tables']['users']['SELECT']
+        {'count': 120, 'errors': 0, 'mean_ms': 1.8, 'p95_ms': 5.0, ...}
+"""
+import re
+import time
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from functools import lru_cache
+
+from src.utilities import echo
+
+# upper bounds of the latency histogram buckets in milliseconds
+BOUNDS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf'))
+TARGET = re.compile(r'\b(?:FROM|INTO(?:\s+TABLE)?|UPDATE|TABLE|DESC|DESCRIBE|JOIN)\s+`?(\w+)', re.I)
+
+
+@lru_cache(maxsize=4096)
+def classify(statement):
+    """returns the operation and the first table named by a statement"""
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    match = TARGET.search(statement)
+    return verb, match.group(1) if match else None
+
+
+def size(rows):
+    """estimated number of bytes in fetched rows"""
+    total = 0
+    for row in rows:
+        for value in row:
+            if isinstance(value, (str, bytes, bytearray)):
+                total += len(value)
+            elif value is not None:
+                total += 8
+
+    return total
+
+
+@dataclass
+class Event:
+    """one executed statement"""
+    statement: str
+    operation: str
+    table: str = None
+    seconds: float = 0.0
+    rows: int = 0
+    affected: int = 0
+    bytes: int = 0
+    error: str = None
+
+    @property
+    def ms(self):
+        return self.seconds * 1000
+
+
+class Histogram:
+    """latency histogram and counters of one operation"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.affected = 0
+        self.bytes = 0
+        self.buckets = [0] * len(BOUNDS)
+
+    def add(self, event):
+        self.count += 1
+        self.errors += event.error is not None
+        self.seconds += event.seconds
+        self.max = max(self.max, event.seconds)
+        self.rows += event.rows
+        self.affected += event.affected
+        self.bytes += event.bytes
+        ms = event.ms
+        self.buckets[next(index for index, bound in enumerate(BOUNDS) if ms <= bound)] += 1
+
+    def percentile(self, fraction):
+        """upper bound in ms of the bucket holding the given fraction of statements"""
+        rank, seen = fraction * self.count, 0
+        for bound, hits in zip(BOUNDS, self.buckets):
+            seen += hits
+            if seen >= rank and hits:
+                return min(bound, round(self.max * 1000, 3))
+
+        return 0.0
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total_ms': round(self.seconds * 1000, 3),
+            'mean_ms': round(self.seconds * 1000 / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'rows': self.rows,
+            'affected': self.affected,
+            'bytes': self.bytes,
+            'histogram': {f"<={bound}ms": hits for bound, hits in zip(BOUNDS, self.buckets) if hits},
+        }
+
+
+class Instrument:
+    """collects the events of one MashaDB object.
+
+       ARGUMENTS:
+            slow_query: float: seconds after which a statement is logged as slow
+            slow_log:   int:   number of slow statements kept in slow
+            hooks:      list:  callables called with every Event
+    """
+
+    def __init__(self, slow_query=None, slow_log=1000, hooks=()):
+        self.slow_query = slow_query
+        self.slow = deque(maxlen=slow_log)
+        self.hooks = list(hooks)
+        self.operations = defaultdict(Histogram)
+        self.tables = defaultdict(lambda: defaultdict(Histogram))
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        count = sum(histogram.count for histogram in self.operations.values())
+        return f"{type(self).__name__}(statements={count}, slow_query={self.slow_query}, hooks={len(self.hooks)})"
+
+    @classmethod
+    def create(cls, option):
+        """build an instrument from the MashaDB instrument argument"""
+        if option is None or option is False:
+            return None
+
+        if isinstance(option, cls):
+            return option
+
+        if option is True:
+            return cls()
+
+        return cls(**option)
+
+    def record(self, event):
+        """aggregate an event, log it when slow and pass it to the hooks"""
+        with self.lock:
+            self.operations[event.operation].add(event)
+            if event.table is not None:
+                self.tables[event.table][event.operation].add(event)
+
+        if self.slow_query is not None and event.seconds >= self.slow_query:
+            self.slow.append(event)
+            echo.alert(f"Slow query ({event.ms:.1f} ms): {event.statement}")
+
+        for hook in self.hooks:
+            try:
+                hook(event)
+
+            except Exception as error:
+                echo.alert(f"Query hook {getattr(hook, '__name__', hook)} failed: {error}")
+
+    def stats(self, reset=False):
+        """returns the histograms per operation and per table"""
+        with self.lock:
+            stats = {
+                'operations': {operation: histogram.summary() for operation, histogram in self.operations.items()},
+                'tables': {table: {operation: histogram.summary() for operation, histogram in operations.items()}
+                           for table, operations in self.tables.items()},
+                'slow': len(self.slow),
+            }
+            if reset:
+                self.operations.clear()
+                self.tables.clear()
+                self.slow.clear()
+
+        return stats
+
+
+class Cursor:
+    """cursor wrapper that reports its statements to db.instrument and
+       failed statements to db.__failed__(). the statement of a buffered
+       cursor is recorded once its last buffered row has been read.
+    """
+
+    def __init__(self, kursor, db, buffered=False):
+        self._kursor = kursor
+        self._db = db
+        self._buffered = buffered
+        self._event = None
+
+    def __getattr__(self, name):
+        return getattr(self._kursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __measure__(self, method, operation, *args, **kwargs):
+        instrument = self._db.instrument
+        if instrument is None:
+            try:
+                return method(operation, *args, **kwargs)
+
+            except Exception as error:
+                self._db.__failed__(error)
+                raise
+
+        self.__finish__()
+        event = Event(operation, *classify(operation))
+        start = time.perf_counter()
+        try:
+            result = method(operation, *args, **kwargs)
+
+        except Exception as error:
+            event.seconds = time.perf_counter() - start
+            event.error = str(error)
+            instrument.record(event)
+            self._db.__failed__(error)
+            raise
+
+        if kwargs.get('multi'):
+            return self.__results__(result, event, start)
+
+        event.seconds = time.perf_counter() - start
+        if self._kursor.with_rows and not (self._buffered and self._kursor.rowcount == 0):
+            self._event = event
+        else:
+            event.affected = max(self._kursor.rowcount, 0)
+            instrument.record(event)
+
+        return result
+
+    def __results__(self, results, failed, start):
+        """yield the result sets of execute(multi=True), which are read
+           lazily, and record one event per statement once its result has
+           been read. failed is the event recorded when reading fails.
+        """
+        instrument = self._db.instrument
+        while True:
+            try:
+                result = next(results)
+
+            except StopIteration:
+                return
+
+            except Exception as error:
+                failed.seconds = time.perf_counter() - start
+                failed.error = str(error)
+                instrument.record(failed)
+                self._db.__failed__(error)
+                raise
+
+            statement = result.statement or failed.statement
+            event = Event(statement, *classify(statement))
+            event.seconds = time.perf_counter() - start
+            if result.with_rows:
+                self._event = event
+            else:
+                event.affected = max(result.rowcount, 0)
+                instrument.record(event)
+
+            # the connector yields the cursor itself, so fetches go through
+            # this wrapper and are counted
+            yield self if result is self._kursor else result
+            self.__finish__()
+            start = time.perf_counter()
+
+    def __fetch__(self, method, *args, **kwargs):
+        event = self._event
+        if event is None:
+            return method(*args, **kwargs)
+
+        start = time.perf_counter()
+        rows = method(*args, **kwargs)
+        event.seconds += time.perf_counter() - start
+        return rows
+
+    def __finish__(self):
+        event, self._event = self._event, None
+        instrument = self._db.instrument
+        if event is not None and instrument is not None:
+            instrument.record(event)
+
+    def __count__(self, rows):
+        event = self._event
+        if event is not None:
+            event.rows += len(rows)
+            event.bytes += size(rows)
+            if self._buffered and event.rows >= self._kursor.rowcount:
+                self.__finish__()
+
+    def execute(self, operation, *args, **kwargs):
+        return self.__measure__(self._kursor.execute, operation, *args, **kwargs)
+
+    def query(self, konnect, operation):
+        """run a statement without a result through konnect.cmd_query(),
+           which returns the server's OK packet with the info message
+           that execute() drops.
+        """
+        instrument = self._db.instrument
+        self.__finish__()
+        event = Event(operation, *classify(operation))
+        start = time.perf_counter()
+        try:
+            result = konnect.cmd_query(operation)
+
+        except Exception as error:
+            if instrument is not None:
+                event.seconds = time.perf_counter() - start
+                event.error = str(error)
+                instrument.record(event)
+            self._db.__failed__(error)
+            raise
+
+        if instrument is not None:
+            event.seconds = time.perf_counter() - start
+            event.affected = result.get('affected_rows') or 0
+            instrument.record(event)
+
+        return result
+
+    def executemany(self, operation, *args, **kwargs):
+        return self.__measure__(self._kursor.executemany, operation, *args, **kwargs)
+
+    def fetchall(self):
+        rows = self.__fetch__(self._kursor.fetchall)
+        self.__count__(rows)
+        self.__finish__()
+        return rows
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self.__fetch__(self._kursor.fetchmany, *args, **kwargs)
+        self.__count__(rows)
+        if not rows:
+            self.__finish__()
+        return rows
+
+    def fetchone(self):
+        row = self.__fetch__(self._kursor.fetchone)
+        if row is None:
+            self.__finish__()
+        else:
+            self.__count__((row,))
+        return row
+
+    def close(self):
+        self.__finish__()
+        return self._kursor.close()
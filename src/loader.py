@@ -0,0 +1,76 @@
+"""bulk loading through LOAD DATA LOCAL INFILE
+
+   iterators are spooled to a temporary file one row at a time, so rows
+   are never held in memory as a whole. fields are written enclosed in
+   double quotes with no escape character; NULL is written as the bare
+   word NULL, which the server reads as a NULL value, while the quoted
+   string "NULL" stays a string.
+"""
+import os
+import re
+import tempfile
+from decimal import Decimal
+
+DELIMITERS = {'csv': ',', 'tsv': '\t'}
+MODES = {None: '', 'ignore': 'IGNORE', 'replace': 'REPLACE'}
+INFO = re.compile(r'(Records|Deleted|Skipped|Warnings):\s*(\d+)')
+
+
+def field(value):
+    """format one value for the spool file"""
+    if value is None:
+        return 'NULL'
+
+    if isinstance(value, bool):
+        return str(int(value))
+
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+
+    if isinstance(value, bytes):
+        value = value.decode()
+
+    return f'"{str(value).replace(chr(34), chr(34) * 2)}"'
+
+
+def spool(rows, columns, delimiter=',', directory=None):
+    """write rows of dicts or tuples to a temporary file, returns
+       (path, number of rows). the caller removes the file; it is removed
+       here when reading or writing a row fails.
+    """
+    records = 0
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', dir=directory, delete=False, newline='') as spooled:
+        try:
+            for row in rows:
+                values = (row[column] for column in columns) if isinstance(row, dict) else row
+                spooled.write(delimiter.join(map(field, values)) + '\n')
+                records += 1
+
+        except BaseException:
+            spooled.close()
+            os.remove(spooled.name)
+            raise
+
+    return spooled.name, records
+
+
+def counts(info):
+    """the counts of the info message of a LOAD DATA statement,
+       'Records: 3  Deleted: 0  Skipped: 1  Warnings: 0', by lowercase name
+    """
+    return {name.lower(): int(number) for name, number in INFO.findall(info or '')}
+
+
+def statement(table, path, columns=None, delimiter=',', mode='ignore', header=False):
+    """build the LOAD DATA LOCAL INFILE statement"""
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(map(str, MODES))}")
+
+    path = str(path).replace('\\', '\\\\').replace("'", "\\'")
+    delimiter = delimiter.replace('\t', '\\t')
+    columns = f" ({', '.join(columns)})" if columns else ''
+    skip = f" IGNORE {int(header)} LINES" if header else ''
+    mode = f" {MODES[mode]}" if MODES[mode] else ''
+    return (f"LOAD DATA LOCAL INFILE '{path}'{mode} INTO TABLE {table} "
+            f"FIELDS TERMINATED BY '{delimiter}' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            f"LINES TERMINATED BY '\\n'{skip}{columns}")
@@ -1,15 +1,90 @@
-from itertools import chain
-import mysql.connector as engine
+import os
+import time
+import weakref
+import threading
+from functools import wraps
+from itertools import chain, count
+from contextlib import suppress, contextmanager
 from mysql.connector import Error as SQLError
-from pandas import DataFrame as df
 
 from src.utilities import echo
-from src.utilities import expander
-from src.utilities import logic, expansions
-from src.utilities import expansion_operators
+from src.utilities import tabulate
+from src.utilities import expand
+from src.utilities import packed
+from src.backends import Backend
+from src.cache import StatementCache, QueryCache
+from src.instrument import Instrument, Cursor
+from src.batch import Batch
+from src.writer import BufferedWriter
+from src.pipeline import Pipeline
+from src.query import Query, compose, condition, keyset, split
+from src.export import Exporter
+from src.arrays import collect, chunked
+from src import loader
+from src.columns import Schema
 from src.boundinnerclass import BoundInnerClass
 
 
+def pooled(write=False, read=False):
+    """run a MashaDB, Table or Selector method on the calling thread's
+       pooled connection.
+
+       in pooled mode the first operation on a thread checks a connection
+       out of the pool; it is returned when the outermost operation ends.
+       write operations pin the connection to the thread until commit() or
+       rollback() so that their transaction is not lost. without a pool
+       the method runs unchanged on the shared connection.
+
+       write operations made inside db.batch() are counted by the thread's
+       open batch, which commits them in bounded transactions.
+
+       with replicas configured, read=True operations run on a replica
+       unless the thread has uncommitted writes or wrote within the
+       read_your_writes window.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            db = getattr(self, '_db', self)
+            if db.replicas:
+                if read:
+                    return db.__replicated__(run, self, *args, **kwargs)
+                if write:
+                    db.__wrote__()
+
+            batch = getattr(db._local, 'batch', None) if write else None
+            if batch is not None:
+                return batch.__track__(run, self, *args, **kwargs)
+
+            return run(self, *args, **kwargs)
+
+        def run(self, *args, **kwargs):
+            db = getattr(self, '_db', self)
+            if db.pool is None:
+                try:
+                    return method(self, *args, **kwargs)
+
+                finally:
+                    # connect() opens the pool; return what it checked out
+                    if db.pool is not None:
+                        db.__release__()
+
+            local = db._local
+            local.depth = getattr(local, 'depth', 0) + 1
+            try:
+                return method(self, *args, **kwargs)
+
+            finally:
+                local.depth -= 1
+                if write and getattr(local, 'konnect', None) is not None:
+                    local.pinned = True
+                if local.depth == 0:
+                    db.__release__()
+
+        return wrapper
+    return decorator
+
+
 class MashaDB:
     """python interface for MySQL and MariaDB
 
@@ -21,15 +96,77 @@ class MashaDB:
             db.commit()
             db.closeall()
 
+            Batched Transactions:
+            Writes are committed every N operations or every few seconds.
+
+            with db.batch(commit_every=5000, commit_interval=2.0) as batch:
+                db.table.write(**data)
+
+            SQLite:
+            The same API on a database file, or in memory without a database.
+
+            db = MashaDB(backend='sqlite', database='app.db')
+            db = MashaDB(backend='sqlite')
+
+            Read Replicas:
+            Reads go to the replicas, writes and transactions to the primary.
+
+            db = MashaDB(replicas=[{'host': 'replica1'}, {'host': 'replica2'}], **config)
+
+            Connection Pool:
+            Each thread checks out its own connection and cursor.
+
+            db = MashaDB(pool_size=8, **config)
+            db.connect(database=db_name)
+
+            Tables:
+            Tables are bound as attributes on first access. Pass eager=True
+            to bind every table when connecting.
+
+            db.tables
+            db.users.columns
+
+            Result Cache:
+            Repeated reads are served from memory until the table is written.
+
+            db = MashaDB(query_cache={'maxsize': 512, 'ttl': 60}, **config)
+            db.query_cache.info()
+
+            Instrumentation:
+            Statements are timed and aggregated per table and operation.
+
+            db = MashaDB(instrument={'slow_query': 0.5}, **config)
+            db.on_query(callback)
+            db.stats()
+
+            Pipelining:
+            Independent statements share round trips to the server.
+
+            with db.pipeline() as pipe:
+                user = pipe.users.select(column).where(id=7)
+                pipe.visits.write(**data)
+
             Write Operations:
 
             db.table.write(column=data, column=data, column=data)
             db.table.write(**data)
+            writer = db.table.buffered_writer(max_rows=500, max_latency_ms=20)
+            db.table.write_many(rows, batch_size=1000)
+            db.table.load('data.csv', header=True)
+            db.table.upsert_many(rows)
+            db.table.update_many({id: {column: data}})
+            db.table.delete_where(city='Berlin or Paris', id='+1000')
+            db.table.update_where(set={column: data}, id='1..1000')
 
             Read Operations:
 
             data = db.table.select(column, column).all(sort=column)
             data = db.table.select(column).where(clause, limit=10)
+            pages = db.table.select(column).paginate(1000)
+            query = db.table.select(column).compile(column=...)
+            data = query(column=value)
+            rows = db.table.select(column).iter(chunk_size=1000)
+            frame = db.table.select(column).to_frame(column=value)
 
             With Context Manager:
             Automatically commits data and closes the connection.
@@ -50,7 +187,9 @@ class MashaDB:
                 )
     """
 
-    def __init__(self, **kwargs):
+    def __init__(self, pool_size=None, eager=False, statement_cache=0, query_cache=None,
+                 instrument=None, backend=None, replicas=None, balance='round_robin',
+                 read_your_writes=None, **kwargs):
         """ ARGUMENTS:
                 Required:
 
@@ -61,6 +200,32 @@ class MashaDB:
                 Optional:
 
                 database=database_name
+                pool_size=number of pooled connections; enables
+                          thread-safe pooled mode
+                eager=True binds every table as an attribute at connect
+                      instead of on first access
+                statement_cache=number of prepared statements kept per
+                                connection; 0 (default) sends parameters
+                                with plain queries. with mysql-connector
+                                8.0 prepared statements return DECIMAL,
+                                YEAR and BIT columns as str and fail on
+                                binary columns that are not utf-8
+                query_cache=caches Selector results; True, a maximum
+                            number of results, a dict of QueryCache
+                            arguments or a QueryCache
+                instrument=records statement timings; True, a dict of
+                           Instrument arguments or an Instrument
+                backend='mysql' (default) or 'sqlite', or a Backend;
+                        sqlite needs no user, password or host
+                replicas=list of configs of read replicas; each is merged
+                         over the primary config, so host and port are
+                         usually enough
+                balance='round_robin' (default) or 'latency'; how reads
+                        are spread over the replicas
+                read_your_writes=seconds after a commit during which the
+                                 committing thread reads from the primary.
+                                 replica reads are cached only by a
+                                 query_cache with a ttl
 
                 any other keyword arguments that must be passed to
                 mysql.connector to ensure its system compatibilty and
@@ -87,16 +252,299 @@ class MashaDB:
 
                 pass keyword arguments:
                 db = MashaDB(user=user, password=password, host=host, database=database)
+
+                share one object between threads:
+                db = MashaDB(pool_size=8, **config)
+
+                read from replicas:
+                db = MashaDB(replicas=[{'host': 'replica1'}, {'host': 'replica2'}], **config)
+                db = MashaDB(replicas=[{'port': 3307}, {'port': 3308}], balance='latency',
+                             read_your_writes=2.0, **config)
         """
+        if balance not in ('round_robin', 'latency'):
+            raise ValueError("balance must be 'round_robin' or 'latency'")
+
         self.verbose = True
-        self.config = kwargs
-        self.host = self.config['host']
+        self.backend = Backend.create(backend)
+        self.config = {**self.backend.defaults, **kwargs}
+        if pool_size:
+            self.__concurrent__('pool_size')
+
+        self.host = self.config.get('host')
         self.database = self.config.get('database')
+        self.pool_size = pool_size
+        self.pool = None
+        self.eager = eager
+        self._local = threading.local()
+        self._savepoints = count()
+        self._schemas = {}
+        self._tables = None
+        self._exists = {}
+        self.statement_cache = statement_cache
+        self._statements = weakref.WeakKeyDictionary()
+        self.query_cache = QueryCache.create(query_cache)
+        self.instrument = Instrument.create(instrument)
+        self._writers = []
+        self.balance = balance
+        self.read_your_writes = read_your_writes
+        self.replicas = [MashaDB(pool_size=pool_size, statement_cache=statement_cache,
+                                 backend=type(self.backend), **{**kwargs, **replica}) for replica in replicas or ()]
+        for replica in self.replicas:
+            replica.verbose = False
+            replica._primary = self
+        self._turn = count()
+        self._latency = {}
 
     def __server_connect__(self):
-        self.konnect = engine.connect(**self.config)
-        self.kursor = self.konnect.cursor(buffered=True)
-        self.version = self.konnect.get_server_info()
+        if self.pool_size:
+            self.pool = self.backend.pool(self.pool_size, self.config)
+            self._slots = threading.BoundedSemaphore(self.pool_size)
+            self.version = self.konnect.get_server_info()
+            return
+
+        self._konnect = self.backend.connect(self.config)
+        self._kursor = self.__cursor__(self._konnect, buffered=True)
+        self.version = self._konnect.get_server_info()
+
+    def __checkout__(self):
+        """check a connection out of the pool for the calling thread.
+           blocks while every pooled connection is in use.
+        """
+        local = self._local
+        if getattr(local, 'konnect', None) is None:
+            self._slots.acquire()
+            try:
+                local.konnect = self.pool.get_connection()
+
+            except SQLError:
+                self._slots.release()
+                raise
+
+            local.kursor = self.__cursor__(local.konnect, buffered=True)
+            local.pinned = False
+
+        return local
+
+    def __release__(self, force=False):
+        """return the calling thread's connection to the pool unless it
+           holds uncommitted writes.
+        """
+        local = self._local
+        if getattr(local, 'konnect', None) is None or (local.pinned and not force):
+            return
+
+        try:
+            local.kursor.close()
+            local.konnect.rollback()
+            local.konnect.close()
+
+        finally:
+            local.konnect = local.kursor = None
+            local.pinned = False
+            self._slots.release()
+
+    def __prepared__(self, statement, params=()):
+        """execute a parameterized statement, through the calling connection's
+           cache of prepared statements when statement_cache is set. returns
+           a cursor holding the result, which must be fetched completely
+           before the next statement.
+        """
+        if not self.statement_cache:
+            self.kursor.execute(statement, tuple(params))
+            return self.kursor
+
+        # a pooled connection is a wrapper that is discarded on return to
+        # the pool, so statements are cached on the connection it wraps.
+        konnect = self.backend.unwrap(self.konnect)
+        statements = self._statements.get(konnect)
+        if statements is None:
+            statements = self._statements[konnect] = StatementCache(konnect, self.statement_cache, self.__cursor__)
+
+        return statements.execute(statement, params)
+
+    @contextmanager
+    def __atomic__(self):
+        """make a group of statements atomic within the current transaction.
+           a failing group is rolled back to a savepoint, leaving earlier
+           uncommitted work in place.
+        """
+        savepoint = f"masha_{next(self._savepoints)}"
+        self.kursor.execute(f"SAVEPOINT {savepoint}")
+        try:
+            yield
+
+        except Exception:
+            self.kursor.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+            raise
+
+        else:
+            self.kursor.execute(f"RELEASE SAVEPOINT {savepoint}")
+
+    def __cursor__(self, konnect, **options):
+        """open a cursor on konnect that reports to the instrument"""
+        return Cursor(konnect.cursor(**options), self, options.get('buffered', False))
+
+    def __concurrent__(self, feature):
+        """raise ValueError for a feature that works on connections of its
+           own when the database allows only one.
+        """
+        if self.backend.pool_limit(self.config) == 1:
+            raise ValueError(f"{feature} needs a database that allows concurrent connections; "
+                             f"use a database file with the {self.backend.name} backend")
+
+    def __connection__(self):
+        """open a new connection outside of the pool for a dedicated worker.
+           the caller closes it. check __concurrent__() first.
+        """
+        return self.backend.connect(self.config)
+
+    @property
+    def instrument(self):
+        """the instrument of the database; replicas report to the one of
+           their primary, including one enabled later by on_query().
+        """
+        primary = self.__dict__.get('_primary')
+        return self._instrument if primary is None else primary.instrument
+
+    @instrument.setter
+    def instrument(self, instrument):
+        self._instrument = instrument
+
+    @property
+    def konnect(self):
+        """the connection serving the calling thread"""
+        if self.replicas and getattr(self._local, 'replica', None) is not None:
+            return self._local.replica.konnect
+
+        if self.pool is None:
+            return self._konnect
+
+        return self.__checkout__().konnect
+
+    @property
+    def kursor(self):
+        """the cursor serving the calling thread"""
+        if self.replicas and getattr(self._local, 'replica', None) is not None:
+            return self._local.replica.kursor
+
+        if self.pool is None:
+            return self._kursor
+
+        return self.__checkout__().kursor
+
+    def __replica__(self):
+        """the connected replica that serves the next read, or None"""
+        live = [replica for replica in self.replicas if replica.__dict__.get('version')]
+        if not live:
+            return None
+
+        if self.balance == 'latency':
+            return min(live, key=lambda replica: self._latency.get(replica, 0.0))
+
+        return live[next(self._turn) % len(live)]
+
+    def __replicated__(self, run, *args, **kwargs):
+        """run a read operation on a replica. reads stay on the primary
+           while the thread has uncommitted writes or an open batch, and
+           for read_your_writes seconds after its last commit.
+        """
+        local = self._local
+        if (getattr(local, 'replica', None) is not None or getattr(local, 'dirty', False)
+                or getattr(local, 'batch', None) is not None
+                or (self.read_your_writes and time.monotonic() - getattr(local, 'settled', float('-inf')) < self.read_your_writes)):
+            return run(*args, **kwargs)
+
+        replica = self.__replica__()
+        if replica is None:
+            return run(*args, **kwargs)
+
+        local.replica = replica
+        start = time.perf_counter()
+        try:
+            return run(*args, **kwargs)
+
+        finally:
+            local.replica = None
+            seconds = time.perf_counter() - start
+            # moving average, so one slow read does not sideline a replica
+            self._latency[replica] = 0.8 * self._latency.get(replica, seconds) + 0.2 * seconds
+            if replica.pool is not None:
+                replica.__release__(force=True)
+
+    def __wrote__(self):
+        """the calling thread started a write; its reads go to the primary"""
+        self._local.dirty = True
+
+    def __settled__(self, committed=True):
+        """the calling thread's transaction ended. the tables it wrote are
+           invalidated again, as other threads may have cached their
+           committed rows between the write and its commit.
+        """
+        local = self._local
+        if committed and getattr(local, 'dirty', False):
+            local.settled = time.monotonic()
+        local.dirty = False
+
+        written = getattr(local, 'written', None)
+        if written:
+            local.written = set()
+            if None in written:
+                self.query_cache.clear()
+            else:
+                self.query_cache.invalidate(*written)
+
+    def __checkpoint__(self, *tables):
+        """commit the calling thread's transaction inside a chunked write
+           operation as commit() does: cached reads of the written tables
+           are invalidated and a pooled connection is returned.
+        """
+        self.__invalidate__(*tables, schema=False)
+        self.konnect.commit()
+        self.__settled__()
+        if self.pool is not None:
+            self.__release__(force=True)
+
+    def __chunkable__(self, operation):
+        """whether a chunked write operation may commit. it may not inside
+           db.batch() or while the thread holds uncommitted writes on its
+           pooled connection.
+        """
+        local = self._local
+        if getattr(local, 'batch', None) is not None or getattr(local, 'pinned', False):
+            echo.alert(f"{operation} with chunk_size commits every chunk; run it outside of db.batch() "
+                       "and after commit() or rollback(), or leave out chunk_size")
+            return False
+
+        return True
+
+    def on_query(self, callback):
+        """call callback with an Event for every executed statement.
+           enables instrumentation when it is off. returns the callback,
+           so it can be used as a decorator.
+
+           USAGE:
+                @db.on_query
+                def trace(event):
+                    print(event.table, event.operation, event.ms, event.rows)
+        """
+        if self.instrument is None:
+            self.instrument = Instrument()
+
+        self.instrument.hooks.append(callback)
+        return callback
+
+    def stats(self, reset=False):
+        """returns statement counts, latency percentiles and histograms,
+           rows and bytes per operation and per table.
+
+           USAGE:
+                db.stats()['operations']['SELECT']['p95_ms']
+                db.stats()['tables']['users']['UPDATE']['count']
+        """
+        if self.instrument is None:
+            return {'operations': {}, 'tables': {}, 'slow': 0}
+
+        return self.instrument.stats(reset)
 
     def __enter__(self):
         self.verbose = False
@@ -110,6 +558,22 @@ class MashaDB:
     def __repr__(self):
         return f'{self.__status__()}'
 
+    def __getattr__(self, name):
+        """bind database tables as attributes on first access"""
+        if name.startswith('_') or self.__dict__.get('version') is None:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        if not self.__exists__(name):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute or table '{name}'")
+
+        table = self.Table(name)
+        setattr(self, name, table)
+        return table
+
+    def __dir__(self):
+        return list(super().__dir__()) + list(self._tables or ())
+
+    @pooled()
     def __status__(self):
         """displays database and connection status"""
         name = type(self).__name__
@@ -124,6 +588,72 @@ class MashaDB:
 
         return f"{name} isn't connected. Use obj.connect() to connect to {self.host}."
 
+    def __invalidate__(self, *tables, schema=True):
+        """discard cached results and metadata for the named tables, or for
+           every table and the table listing when called without arguments.
+           writes pass schema=False to keep the table metadata.
+        """
+        if self.query_cache is not None:
+            if tables:
+                self.query_cache.invalidate(*tables)
+            else:
+                self.query_cache.clear()
+
+            local = self._local
+            if self.pool is not None and getattr(local, 'konnect', None) is not None:
+                # None marks a write to tables that are not known
+                local.written = getattr(local, 'written', set()) | (set(tables) or {None})
+
+        if not schema:
+            return
+
+        if not tables:
+            self._schemas.clear()
+            self._exists.clear()
+            self._tables = None
+
+        for table in tables:
+            self._schemas.pop(table, None)
+
+    def __read__(self, table, query, params, fetch):
+        """serve a SELECT on table from the query cache, calling fetch() on
+           a miss. reads made while the thread holds uncommitted writes in
+           pooled mode are not cached. reads served by a replica, which may
+           lag behind the writes that invalidate the cache, are cached only
+           when the cache has a ttl to bound how stale they can get.
+        """
+        cache = self.query_cache
+        if cache is None or getattr(self._local, 'pinned', False):
+            return fetch()
+
+        key = (query, tuple(params))
+        rows = cache.get(key)
+        if rows is not None:
+            return list(rows)
+
+        generation = cache.generation(table)
+        rows = fetch()
+        if rows is not None and (cache.ttl is not None or getattr(self._local, 'replica', None) is None):
+            cache.put(table, key, rows, generation)
+
+        return rows
+
+    def __catalog__(self, table, exists):
+        """record the creation or removal of a table"""
+        self._exists[table] = exists
+        self._tables = None
+        self.__invalidate__(table)
+
+    def __exists__(self, table):
+        """cached check for the existence of a table"""
+        if self._tables is not None:
+            return table in self._tables
+
+        if table not in self._exists:
+            self._exists[table] = self.table_exists(table)
+
+        return self._exists[table]
+
     def __update_tables__(self):
         """database tables are added as object attributes"""
         for table in self.tables:
@@ -131,25 +661,45 @@ class MashaDB:
                 setattr(self, table, self.Table(table))
 
     @property
+    @pooled()
     def databases(self):
         """returns list of databases"""
         try:
-            self.kursor.execute('SHOW DATABASES')
+            self.kursor.execute(self.backend.databases())
             return tuple(chain(*self.kursor.fetchall()))
 
         except SQLError as error:
             echo.alert(error)
 
     @property
+    @pooled()
+    def max_packet(self):
+        """returns the server's max_allowed_packet size in bytes"""
+        if '_max_packet' not in self.__dict__:
+            self.kursor.execute(self.backend.max_packet())
+            self._max_packet = int(self.kursor.fetchone()[0])
+
+        return self._max_packet
+
+    @property
+    @pooled()
     def tables(self):
-        """returns a list of tables contained in the database"""
+        """returns a list of tables contained in the database.
+           the listing is cached until a table is created, dropped or
+           renamed.
+        """
+        if self._tables is not None:
+            return self._tables
+
         try:
-            self.kursor.execute("SHOW TABLES")
-            return tuple(chain(*self.kursor.fetchall()))
+            self.kursor.execute(self.backend.tables())
+            self._tables = tuple(chain(*self.kursor.fetchall()))
+            return self._tables
 
         except (AttributeError, SQLError):
             echo.alert(f'{type(self).__name__} is not connected to a database')
 
+    @pooled()
     def connect(self, database=None):
         if database:
             self.config.update({'database': database})
@@ -157,10 +707,14 @@ class MashaDB:
         connection = self.config.get('database', self.host)
 
         try:
+            self.__invalidate__()
             self.__server_connect__()
-            if connection != self.host and self.konnect.is_connected():
+            if self.eager and connection != self.host and self.konnect.is_connected():
                 self.__update_tables__()
 
+            for replica in self.replicas:
+                replica.connect(database)
+
             if self.verbose:
                 echo.info(f"MashaDB {self.version} Connected to {connection}")
 
@@ -171,10 +725,18 @@ class MashaDB:
         except SQLError as error:
             echo.alert(error)
 
+    @pooled(write=True)
     def execute(self, query):
         """execute any mysql command or statement"""
         try:
             self.kursor.execute(query)
+            verb = query.lstrip().split(' ', 1)[0].upper()
+            if verb in ('ALTER', 'CREATE', 'DROP', 'RENAME'):
+                self.__invalidate__()
+
+            elif verb not in ('SELECT', 'SHOW', 'DESC', 'DESCRIBE', 'EXPLAIN'):
+                self.__invalidate__(schema=False)
+
             if self.kursor.with_rows:
                 return tuple(chain(*self.kursor.fetchall()))
 
@@ -185,9 +747,10 @@ class MashaDB:
         except SQLError as error:
             echo.alert(error)
 
+    @pooled()
     def table_exists(self, table):
         """checks for the existence of a table in the database"""
-        self.kursor.execute(f"show tables like '{table}'")
+        self.kursor.execute(self.backend.table_exists(table))
         try:
             _ = self.kursor.fetchone()[0]
             return True
@@ -195,6 +758,7 @@ class MashaDB:
         except TypeError:
             return False
 
+    @pooled(write=True)
     def create(self, table: str, **kwargs: str) -> None:
         """create a new table in the database.
 
@@ -218,14 +782,10 @@ class MashaDB:
 
                 db.create(id=primary.key, Name=name.column, Email=email.column)
         """
-        statement = []
-        for key, value in kwargs.items():
-            if value.endswith('PRIMARY KEY'):
-                statement.append(f"{key} {value}({key})")
-            else:
-                statement.append(f"{key} {value}")
+        statement = [self.backend.column(key, value) for key, value in kwargs.items()]
         try:
             self.kursor.execute(f"CREATE TABLE IF NOT EXISTS {table}({', '.join(statement)})")
+            self.__catalog__(table, True)
             if self.verbose:
                 echo.info(f'Created Table {table}')
 
@@ -234,6 +794,14 @@ class MashaDB:
         else:
             setattr(self, table, self.Table(table))
 
+    def __unbind__(self, table):
+        """remove a table attribute. raises AttributeError for unknown tables"""
+        if not self.__exists__(table):
+            raise AttributeError(table)
+
+        self.__dict__.pop(table, None)
+
+    @pooled(write=True)
     def drop(self, table):
         """remove specified table from the database.
 
@@ -244,8 +812,9 @@ class MashaDB:
                 db.drop('users')
         """
         try:
-            delattr(self, table)
+            self.__unbind__(table)
             self.kursor.execute(f"DROP TABLE IF EXISTS {table}")
+            self.__catalog__(table, False)
 
         except AttributeError:
             echo.alert(f"The table '{table}' does not exist")
@@ -257,6 +826,7 @@ class MashaDB:
             if self.verbose:
                 echo.info(f"Table {table} has been deleted.")
 
+    @pooled(write=True)
     def rename(self, table, new_name):
         """rename a table in the database.
 
@@ -268,8 +838,10 @@ class MashaDB:
                 db.rename('users', 'superusers')
         """
         try:
-            delattr(self, table)
+            self.__unbind__(table)
             self.kursor.execute(f'ALTER TABLE {table} RENAME TO {new_name}')
+            self.__catalog__(table, False)
+            self.__catalog__(new_name, True)
 
         except AttributeError:
             echo.alert(f"The table '{table}' does not exist")
@@ -282,30 +854,141 @@ class MashaDB:
             echo.info(f"Table {table} has been renamed {new_name}")
 
     def commit(self):
-        """commit the last transaction(s) and make changes permanent"""
+        """commit the last transaction(s) and make changes permanent.
+           in pooled mode this commits the calling thread's transaction.
+        """
         try:
             self.konnect.commit()
+            self.__settled__()
             if self.verbose:
                 echo.info("Data Commit")
 
         except SQLError as error:
             echo.alert(error)
 
+        finally:
+            if self.pool is not None:
+                self.__release__(force=True)
+
+    @contextmanager
+    def batch(self, commit_every=1000, commit_interval=None, report=None):
+        """group the calling thread's writes into bounded transactions.
+
+           the open batch is committed after commit_every write operations
+           or commit_interval seconds. a write operation that fails rolls
+           back its batch only and the block continues with a new batch.
+           an exception leaving the block rolls back the open batch and
+           is raised again; otherwise the last batch is committed on exit.
+           a batch opened inside another batch joins the outer one.
+
+           ARGUMENTS:
+                commit_every:    int:      write operations per transaction
+                commit_interval: float:    seconds before a batch is committed
+                report:          callable: called with the summary dict of
+                                           every finished batch
+
+           RETURNS:
+                Batch: batches lists the summary of every finished batch;
+                       summary() totals them; end() commits the open batch
+
+           USAGE:
+                with db.batch(commit_every=5000) as batch:
+                    for row in rows:
+                        db.events.write(**row)
+
+                print(batch.summary())
+        """
+        local = self._local
+        if getattr(local, 'batch', None) is not None:
+            yield local.batch
+            return
+
+        batch = local.batch = Batch(self, commit_every, commit_interval, report)
+        try:
+            yield batch
+
+        except BaseException as error:
+            batch.error = batch.error or error
+            batch.end(commit=False)
+            raise
+
+        else:
+            batch.end()
+
+        finally:
+            local.batch = None
+
+    def pipeline(self, max_statements=100):
+        """queue Table and Selector calls and send them together in multi
+           statement round trips. each queued call returns a Result whose
+           value is set when the pipeline is sent.
+
+           ARGUMENTS:
+                max_statements: int: statements sent per round trip
+
+           RETURNS:
+                Pipeline: tables are reached as attributes; send() runs the
+                          queued statements and returns their values in
+                          order; leaving a with block sends them
+
+           USAGE:
+                with db.pipeline() as pipe:
+                    user = pipe.users.select('name').where(id=7)
+                    exists = pipe.orders.record_exists('user_id', 7)
+                    pipe.visits.write(user_id=7, page='/home')
+
+                user.value, exists.value
+        """
+        return Pipeline(self, max_statements)
+
+    def __failed__(self, error):
+        """a statement failed; fails the calling thread's open batch"""
+        batch = getattr(self._local, 'batch', None)
+        if batch is not None:
+            batch.__failed__(error)
+
     def rollback(self):
-        """roll back the current transaction and cancel its changes"""
+        """roll back the current transaction and cancel its changes.
+           in pooled mode this rolls back the calling thread's transaction.
+        """
         try:
             self.konnect.rollback()
+            self.__invalidate__(schema=False)
+            self.__settled__(committed=False)
             if self.verbose:
                 echo.info("Rollback Successful")
 
         except SQLError as error:
             echo.alert(error)
 
+        finally:
+            if self.pool is not None:
+                self.__release__(force=True)
+
     def closeall(self):
-        """close the connection to the database"""
-        if self.konnect.is_connected():
+        """close the connection to the database. in pooled mode the calling
+           thread's connection is returned and idle connections are closed.
+           open buffered writers write their queued rows and stop first.
+        """
+        for writer in list(self._writers):
+            writer.close()
+
+        for replica in self.replicas:
+            if replica.__dict__.get('version'):
+                replica.closeall()
+
+        if self.pool is not None:
+            self.__release__(force=True)
+            with suppress(AttributeError):
+                self.backend.close_pool(self.pool)
+            self.backend.close()
+            if self.verbose:
+                echo.info("Connection Pool Closed. Session Ended.")
+
+        elif self.konnect.is_connected():
             self.kursor.close()
             self.konnect.close()
+            self.backend.close()
             if self.verbose:
                 echo.info("MariaDB Server Has Disconnected. Session Ended.")
 
@@ -343,53 +1026,85 @@ class MashaDB:
         def __init__(self, outer, tablename):
             self._name = tablename
             self._base = outer.config['database']
-            self.kursor = outer.kursor
+            self._db = outer
             self.verbose = outer.verbose
-            setattr(self.Selector, 'kursor', self.kursor)
 
         def __repr__(self):
+            labels = {0: 'COLUMNS:', 1: 'TYPES:', 2: 'NULL'}
+            try:
+                from pandas import DataFrame as df
+
+            except ImportError:
+                return tabulate(list(zip(*self.describe()))[:3], labels.values())
+
             rep = df(self.describe()).transpose().head(3)
-            return f"{rep.rename(index={0: 'COLUMNS:', 1: 'TYPES:', 2: 'NULL'}).to_string(header=False)}"
+            return f"{rep.rename(index=labels).to_string(header=False)}"
 
         def __str__(self):
             return self._name
 
         @ property
+        def kursor(self):
+            return self._db.kursor
+
+        @ property
+        @ pooled(read=True)
         def rows(self):
             self.kursor.execute(f"SELECT COUNT(*) FROM {self._name};")
             return self.kursor.fetchone()[0]
 
         @ property
         def columns(self):
-            return [column[0] for column in self.describe()]
+            return self.schema.columns
 
         @ property
         def primary(self):
-            self.kursor.execute(f"SELECT COLUMN_NAME from information_schema.KEY_COLUMN_USAGE \
-                                where TABLE_NAME='{self._name}' and constraint_name = 'PRIMARY'")
+            return self.schema.primary
+
+        @ property
+        def schema(self):
+            """cached column names, types, nullability and primary key.
+               loaded on first use and discarded by DDL operations.
+            """
+            schema = self._db._schemas.get(self._name)
+            return schema if schema is not None else self.__load_schema__()
+
+        @ pooled()
+        def __load_schema__(self):
             try:
-                return self.kursor.fetchone()[0]
+                self.kursor.execute(self._db.backend.describe(self._name))
+                description = self.kursor.fetchall()
+                self.kursor.execute(self._db.backend.primary(self._name))
+                primary = self.kursor.fetchone()
 
-            except TypeError:
-                return 0
+            except SQLError as error:
+                echo.alert(error)
+            else:
+                schema = Schema.load(description, primary[0] if primary else 0)
+                self._db._schemas[self._name] = schema
+                return schema
+
+        def refresh(self):
+            """discard the cached schema and load it again from the server"""
+            self._db.__invalidate__(self._name)
+            return self.schema
 
         def describe(self):
             """returns information about data stored within the table.
 
                this method is called by __repr__, which formats the
-               output using a pandas dataframe. This provides an elegant
-               display while using the repl, but there is considerable
-               overhead when loading the pandas module. It has no use in
-               production so my advice is to disable it.
-            """
-            try:
-                self.kursor.execute(f"DESC {self._name};")
+               output using a pandas dataframe when pandas is installed.
+               pandas is imported on the first repr only, so production
+               code that never displays a table does not pay for it.
 
-            except SQLError as error:
-                echo.alert(error)
-            else:
-                return self.kursor.fetchall()
+               the result is served from the cached schema; call refresh()
+               after altering the table outside of MashaDB.
+            """
+            schema = self.schema
+            if schema is not None:
+                return list(schema.description)
 
+        @ pooled(write=True)
         def write(self, **kwargs):
             """insert data into the table
 
@@ -402,17 +1117,349 @@ class MashaDB:
                 db.table.write(**data)
                 db.table.write(column=data, column=data, column=data)
             """
-            data = tuple(kwargs.values())
-            columns = ', '.join(kwargs.keys())
-            values = ('%s, ' * len(data)).strip(', ')
             try:
-                self.kursor.execute(f'INSERT IGNORE INTO {self._name} ({columns}) VALUES ({values})', data)
+                self.kursor.execute(*self.__insert__(kwargs))
                 if self.verbose:
                     echo.info(f"{self.kursor.rowcount} record inserted into {self._name}")
 
             except SQLError as error:
                 echo.alert(error)
 
+            finally:
+                self._db.__invalidate__(self._name, schema=False)
+
+        def __insert__(self, row):
+            """the statement and parameters of write(**row)"""
+            values = ('%s, ' * len(row)).strip(', ')
+            return f"{self._db.backend.insert(self._name, row, ignore=True)}({values})", tuple(row.values())
+
+        @ pooled(write=True)
+        def write_many(self, rows, columns=None, batch_size=1000):
+            """insert many rows using batched multi-row INSERT statements
+
+               rows are consumed lazily, so generators are streamed one
+               batch at a time. each batch is capped by batch_size and by
+               the server's max_allowed_packet.
+
+               ARGUMENTS:
+                    rows:       iterable: dicts or tuples of row data
+                    columns:    list:     column names; defaults to the keys
+                                          of the first dict or to all
+                                          table columns for tuples
+                    batch_size: int:      maximum rows per statement
+
+               RETURNS:
+                    list: the number of rows inserted by each batch
+
+               USAGE:
+                    db.table.write_many([{'name': 'Al'}, {'name': 'Bo'}])
+                    db.table.write_many(rows, columns=('name', 'email'))
+                    db.table.write_many(generate_rows(), batch_size=5000)
+            """
+            rows = iter(rows)
+            first = next(rows, None)
+            if first is None:
+                return []
+
+            if columns is None:
+                columns = list(first.keys()) if isinstance(first, dict) else self.columns
+
+            counts = []
+            head = self._db.backend.insert(self._name, columns, ignore=True)
+            row = f"({('%s, ' * len(columns)).strip(', ')})"
+            budget = self._db.max_packet - len(head) - 1024
+            batch_size = self.__batch_size__(batch_size, len(columns))
+            try:
+                for batch in self.__batches__(chain((first,), rows), columns, batch_size, budget):
+                    data = tuple(chain.from_iterable(batch))
+                    self.kursor.execute(f"{head}{', '.join([row] * len(batch))}", data)
+                    counts.append(self.kursor.rowcount)
+
+                if self.verbose:
+                    echo.info(f"{sum(counts)} records inserted into {self._name} in {len(counts)} batch(es)")
+
+            except SQLError as error:
+                echo.alert(error)
+
+            finally:
+                self._db.__invalidate__(self._name, schema=False)
+
+            return counts
+
+        def buffered_writer(self, max_rows=1000, max_latency_ms=50, max_queue=10000, timeout=None, on_error=None):
+            """open a write-behind buffer for the table. write() queues a row
+               and returns at once; a background thread inserts the queued
+               rows over its own connection in multi-row statements, each
+               batch committed as one transaction. raises ValueError on a
+               database that allows one connection only, such as an
+               in-memory sqlite database.
+
+               ARGUMENTS:
+                    max_rows:       int:      rows per INSERT statement
+                    max_latency_ms: float:    longest a row waits before its
+                                              batch is written
+                    max_queue:      int:      rows queued before write() blocks
+                    timeout:        float:    seconds write() blocks on a full
+                                              queue before raising queue.Full;
+                                              None blocks until there is room
+                    on_error:       callable: called with the error and the
+                                              rows of a batch that failed
+
+               RETURNS:
+                    BufferedWriter: write(), write_many(), flush(), close()
+
+               USAGE:
+                    writer = db.events.buffered_writer(max_rows=500, max_latency_ms=20)
+                    writer.write(user=1, action='login')
+                    writer.flush()
+
+                    with db.events.buffered_writer(on_error=log_failed) as writer:
+                        writer.write(**row)
+            """
+            return BufferedWriter(self, max_rows=max_rows, max_latency_ms=max_latency_ms,
+                                  max_queue=max_queue, timeout=timeout, on_error=on_error)
+
+        @ pooled(write=True)
+        def load(self, source, columns=None, format='csv', mode='ignore', header=False):
+            """bulk load rows with LOAD DATA LOCAL INFILE.
+
+               source is a csv or tsv file or any iterable of dicts or
+               tuples. iterables are spooled to a temporary file one row at
+               a time and removed after the load. the connection must be
+               configured with allow_local_infile=True.
+
+               ARGUMENTS:
+                    source:  str:      path of a delimited file
+                             iterable: dicts or tuples of row data
+                    columns: list:     target columns in file order; defaults
+                                       to the keys of the first dict or to
+                                       all table columns
+                    format:  str:      'csv' or 'tsv'
+                    mode:    str:      'ignore' skips rows with duplicate
+                                       keys and 'replace' overwrites them.
+                                       None adds neither keyword; the
+                                       server treats LOAD DATA LOCAL as
+                                       'ignore' then, as it cannot stop
+                                       the client sending the file
+                    header:  bool:     the file starts with a header line
+
+               RETURNS:
+                    dict: loaded, skipped and warnings counts, read from
+                          the server's info message. without it, as with
+                          the C extension of the connector, skipped is
+                          None for files; connect with use_pure=True.
+
+               USAGE:
+                    db.users.load('users.csv', header=True)
+                    db.users.load(rows, columns=('name', 'email'), mode='replace')
+                    db.users.load('users.tsv', format='tsv')
+            """
+            if not self._db.backend.local_infile:
+                echo.alert(f"The {self._db.backend.name} backend has no LOAD DATA LOCAL INFILE; use write_many()")
+                return
+
+            delimiter = loader.DELIMITERS[format]
+            spooled = records = None
+            try:
+                if isinstance(source, (str, os.PathLike)):
+                    path = source
+                else:
+                    rows = iter(source)
+                    first = next(rows, None)
+                    if first is None:
+                        return {'loaded': 0, 'skipped': 0, 'warnings': 0}
+
+                    if columns is None:
+                        columns = list(first.keys()) if isinstance(first, dict) else self.columns
+
+                    spooled, records = loader.spool(chain((first,), rows), columns, delimiter)
+                    path, header = spooled, False
+
+                status = self.kursor.query(self._db.konnect, loader.statement(self._name, path, columns, delimiter, mode, header))
+                counts = loader.counts(status.get('info_msg'))
+                if 'records' in counts:
+                    loaded, skipped = counts['records'] - counts['skipped'], counts['skipped']
+                else:
+                    # the C extension of the connector drops the info message
+                    affected = status.get('affected_rows') or 0
+                    loaded = records if mode == 'replace' and records is not None else affected
+                    skipped = None if records is None else max(records - loaded, 0)
+
+                result = {'loaded': loaded, 'skipped': skipped,
+                          'warnings': counts.get('warnings', status.get('warning_count') or 0)}
+                if self.verbose:
+                    echo.info(f"{loaded} records loaded into {self._name}"
+                              f"{'' if skipped is None else f', {skipped} skipped'}")
+                return result
+
+            except SQLError as error:
+                echo.alert(error)
+
+            finally:
+                self._db.__invalidate__(self._name, schema=False)
+                if spooled:
+                    os.remove(spooled)
+
+        @ pooled(write=True)
+        def upsert_many(self, rows, key=None, columns=None, update=None, batch_size=1000):
+            """insert rows or update the rows they collide with, in batches of
+               multi-row INSERT ... ON DUPLICATE KEY UPDATE statements.
+
+               all batches are applied atomically: when one fails, the rows
+               written by the earlier batches are rolled back as well.
+
+               ARGUMENTS:
+                    rows:       iterable: dicts or tuples of row data
+                    key:        str:      key column(s) left unchanged on
+                                list:     update; defaults to the primary key
+                    columns:    list:     column names; defaults to the keys
+                                          of the first dict or to all
+                                          table columns for tuples
+                    update:     list:     columns overwritten on collision;
+                                          defaults to every non-key column
+                    batch_size: int:      maximum rows per statement
+
+               RETURNS:
+                    list: the affected row count of each batch. MySQL counts
+                          1 per inserted row and 2 per updated row.
+
+               USAGE:
+                    db.users.upsert_many([{'id': 1, 'name': 'Al'}, {'id': 9, 'name': 'Bo'}])
+                    db.users.upsert_many(rows, key='email', update=['name'])
+            """
+            rows = iter(rows)
+            first = next(rows, None)
+            if first is None:
+                return []
+
+            if columns is None:
+                columns = list(first.keys()) if isinstance(first, dict) else self.columns
+
+            keys = [key] if isinstance(key, str) else list(key or [self.primary])
+            update = update or [column for column in columns if column not in keys]
+            head = self._db.backend.insert(self._name, columns)
+            tail = self._db.backend.upsert(keys, update)
+            row = f"({('%s, ' * len(columns)).strip(', ')})"
+            budget = self._db.max_packet - len(head) - len(tail) - 1024
+            batch_size = self.__batch_size__(batch_size, len(columns))
+            counts = []
+            try:
+                with self._db.__atomic__():
+                    for batch in self.__batches__(chain((first,), rows), columns, batch_size, budget):
+                        data = tuple(chain.from_iterable(batch))
+                        self.kursor.execute(f"{head}{', '.join([row] * len(batch))}{tail}", data)
+                        counts.append(self.kursor.rowcount)
+
+                if self.verbose:
+                    echo.info(f"Upserted {sum(counts)} row(s) into {self._name} in {len(counts)} batch(es)")
+
+            except SQLError as error:
+                echo.alert(error)
+                counts = []
+
+            finally:
+                self._db.__invalidate__(self._name, schema=False)
+
+            return counts
+
+        @ pooled(write=True)
+        def update_many(self, changes, batch_size=1000):
+            """update many rows by primary key with batched CASE statements.
+
+               rows that change the same set of columns are grouped and each
+               group is written batch_size rows at a time as
+               UPDATE ... SET column = CASE key WHEN id THEN value ... END
+               WHERE key IN (...). batches are capped by batch_size and by
+               the server's max_allowed_packet. all batches are applied
+               atomically.
+
+               ARGUMENTS:
+                    changes:    dict:     {id: {column: data}}
+                                iterable: (id, {column: data}) pairs
+                    batch_size: int:      maximum rows per statement
+
+               RETURNS:
+                    list: the affected row count of each batch
+
+               USAGE:
+                    db.users.update_many({1: {'name': 'Al'}, 2: {'name': 'Bo', 'city': 'Rome'}})
+            """
+            changes = changes.items() if isinstance(changes, dict) else changes
+            primary = self.primary
+            budget = self._db.max_packet - len(self._name) - 1024
+            pending, sizes = {}, {}
+            counts = []
+
+            def flush(shape):
+                batch = pending.pop(shape)
+                del sizes[shape]
+                cases, data = [], []
+                for column in shape:
+                    cases.append(f"{column} = CASE {primary}{' WHEN %s THEN %s' * len(batch)} ELSE {column} END")
+                    data.extend(chain.from_iterable((id, values[column]) for id, values in batch))
+                ids = [id for id, _ in batch]
+                self.kursor.execute(f"UPDATE {self._name} SET {', '.join(cases)} "
+                                    f"WHERE {primary} IN ({('%s, ' * len(ids)).strip(', ')})", (*data, *ids))
+                counts.append(self.kursor.rowcount)
+
+            try:
+                with self._db.__atomic__():
+                    for id, values in changes:
+                        shape = tuple(values)
+                        # the key is sent once per column and once in IN (...)
+                        length = (len(shape) + 1) * packed(id) + sum(packed(values[column]) + 16 for column in shape)
+                        if shape in pending and sizes[shape] + length > budget:
+                            flush(shape)
+
+                        if shape not in pending:
+                            sizes[shape] = sum(2 * len(column) + len(primary) + 24 for column in shape)
+                        pending.setdefault(shape, []).append((id, values))
+                        sizes[shape] += length
+                        if len(pending[shape]) >= self.__batch_size__(batch_size, 2 * len(shape) + 1):
+                            flush(shape)
+
+                    for shape in list(pending):
+                        flush(shape)
+
+                if self.verbose:
+                    echo.info(f"Updated {sum(counts)} row(s) in {self._name} in {len(counts)} batch(es)")
+
+            except SQLError as error:
+                echo.alert(error)
+                counts = []
+
+            finally:
+                self._db.__invalidate__(self._name, schema=False)
+
+            return counts
+
+        def __batch_size__(self, batch_size, params):
+            """cap batch_size so that a batch of rows with params placeholders
+               each stays within the backend's placeholder limit.
+            """
+            limit = self._db.backend.max_params
+            return max(1, min(batch_size, limit // params)) if limit else batch_size
+
+        @staticmethod
+        def __batches__(rows, columns, batch_size, budget):
+            """group rows into lists of value tuples that fit within the
+               row limit and the packet size budget, measured in bytes.
+            """
+            batch, size = [], 0
+            for row in rows:
+                values = tuple(row[column] for column in columns) if isinstance(row, dict) else tuple(row)
+                length = sum(map(packed, values)) + 4
+                if batch and (len(batch) >= batch_size or size + length > budget):
+                    yield batch
+                    batch, size = [], 0
+
+                batch.append(values)
+                size += length
+
+            if batch:
+                yield batch
+
+        @ pooled(write=True)
         def update(self, id, **kwargs):
             """update columns in a table row with new data
 
@@ -423,16 +1470,23 @@ class MashaDB:
                USAGE:
                     db.table.update('10', name='Someone', email='someone@example.com')
             """
-            data = tuple(kwargs.values())
-            columns = f"{'=%s, '.join(kwargs.keys())}=%s"
             try:
-                self.kursor.execute(f"UPDATE {self._name} SET {columns} WHERE {self.primary}={id}", data)
+                self.kursor.execute(*self.__update__(id, kwargs))
                 if self.verbose:
-                    echo.info(f"Updated Row: {id} Column(s): {columns.replace('=%s', '')}")
+                    echo.info(f"Updated Row: {id} Column(s): {', '.join(kwargs)}")
 
             except SQLError as error:
                 echo.alert(error)
 
+            finally:
+                self._db.__invalidate__(self._name, schema=False)
+
+        def __update__(self, id, changes):
+            """the statement and parameters of update(id, **changes)"""
+            columns = f"{'=%s, '.join(changes.keys())}=%s"
+            return f"UPDATE {self._name} SET {columns} WHERE {self.primary}=%s", (*changes.values(), id)
+
+        @ pooled(write=True)
         def delete(self, id, value):
             """delete a record in the table
 
@@ -444,13 +1498,142 @@ class MashaDB:
                     db.table.delete('user_id', '12')
             """
             try:
-                self.kursor.execute(f"DELETE FROM {self._name} WHERE {id}={value}")
+                self._db.__prepared__(f"DELETE FROM {self._name} WHERE {id}=%s", (value,))
                 if self.verbose:
                     echo.info(f"Deleted row {value} from {self._name}")
 
             except SQLError as error:
                 echo.alert(error)
 
+            finally:
+                self._db.__invalidate__(self._name, schema=False)
+
+        @ pooled(write=True)
+        def delete_where(self, op='and', chunk_size=None, **kwargs):
+            """delete every row matching where() filters in one statement.
+
+               with chunk_size the rows are deleted chunk_size at a time
+               with DELETE ... LIMIT and each chunk is committed, so a huge
+               delete never holds its locks or undo log for long. chunked
+               deletes are refused inside db.batch() and while a pooled
+               thread holds uncommitted writes; without a pool the first
+               chunk commits whatever the connection has pending.
+
+               ARGUMENTS:
+                    op:         str: logical operator between filters
+                    chunk_size: int: rows deleted and committed per statement
+                    kwargs:     str: where() filters; at least one is required
+
+               RETURNS:
+                    int: number of deleted rows
+
+               USAGE:
+                    db.users.delete_where(city='Berlin or Paris')
+                    db.logs.delete_where(created='-2020-01-01', chunk_size=10000)
+            """
+            if not kwargs:
+                echo.alert(f"delete_where needs at least one filter; use DELETE FROM {self._name} to empty the table")
+                return 0
+
+            if chunk_size and not self._db.__chunkable__('delete_where'):
+                return 0
+
+            shape, params = split(kwargs)
+            where = condition(shape, op)
+            deleted = 0
+            try:
+                if not chunk_size:
+                    self.kursor.execute(self._db.backend.delete(self._name, where), params)
+                    deleted = self.kursor.rowcount
+                else:
+                    statement = self._db.backend.delete(self._name, where, chunk_size)
+                    while True:
+                        self.kursor.execute(statement, params)
+                        count = self.kursor.rowcount
+                        deleted += count
+                        self._db.__checkpoint__(self._name)
+                        if count < chunk_size:
+                            break
+
+                if self.verbose:
+                    echo.info(f"Deleted {deleted} row(s) from {self._name}")
+
+            except SQLError as error:
+                echo.alert(error)
+
+            finally:
+                self._db.__invalidate__(self._name, schema=False)
+
+            return deleted
+
+        @ pooled(write=True)
+        def update_where(self, set, op='and', chunk_size=None, **kwargs):
+            """update every row matching where() filters in one statement.
+
+               with chunk_size the matching rows are walked in primary key
+               order and updated chunk_size keys at a time, committing each
+               chunk. chunked updates are refused where chunked deletes
+               are, see delete_where().
+
+               ARGUMENTS:
+                    set:        dict: {column: new_data}
+                    op:         str:  logical operator between filters
+                    chunk_size: int:  rows updated and committed per statement
+                    kwargs:     str:  where() filters; at least one is required
+
+               RETURNS:
+                    int: number of changed rows
+
+               USAGE:
+                    db.users.update_where(set={'city': 'Berlin'}, city='berlin or BERLIN')
+                    db.users.update_where(set={'active': 0}, id='1..100000', chunk_size=5000)
+            """
+            if not kwargs:
+                echo.alert("update_where needs at least one filter; use update_many for explicit rows")
+                return 0
+
+            if chunk_size and not self._db.__chunkable__('update_where'):
+                return 0
+
+            shape, params = split(kwargs)
+            where = condition(shape, op)
+            changes = f"{'=%s, '.join(set.keys())}=%s"
+            data = (*set.values(), *params)
+            updated = 0
+            try:
+                if not chunk_size:
+                    self.kursor.execute(f"UPDATE {self._name} SET {changes} WHERE {where}", data)
+                    updated = self.kursor.rowcount
+                else:
+                    primary = self.primary
+                    statement = f"UPDATE {self._name} SET {changes} WHERE ({where}) AND {primary} BETWEEN %s AND %s"
+                    self.kursor.execute(keyset(self._name, primary, primary, shape, op, chunk_size, first=True), params)
+                    keys = self.kursor.fetchall()
+                    while keys:
+                        self.kursor.execute(statement, (*data, keys[0][0], keys[-1][0]))
+                        updated += self.kursor.rowcount
+                        self._db.__checkpoint__(self._name)
+                        if len(keys) < chunk_size:
+                            break
+                        self.kursor.execute(keyset(self._name, primary, primary, shape, op, chunk_size), (*params, keys[-1][0]))
+                        keys = self.kursor.fetchall()
+
+                    if self._db.pool is not None:
+                        # the last key lookup holds a read snapshot only
+                        self._db.__release__(force=True)
+
+                if self.verbose:
+                    echo.info(f"Updated {updated} row(s) in {self._name}")
+
+            except SQLError as error:
+                echo.alert(error)
+
+            finally:
+                self._db.__invalidate__(self._name, schema=False)
+
+            return updated
+
+        @ pooled(write=True)
         def add(self, column, datatype, location='last'):
             """add a column to table
 
@@ -459,50 +1642,93 @@ class MashaDB:
                     datatype: str: data type of new column i.e varchar(255)
                     location: str: where in the table the column will be inserted
                                    options are:
-                                        'first', 'last' or f'after {column}'
+                                        'first', 'last' or f'after {column}';
+                                   the sqlite backend only adds columns last
 
                USAGE:
                     db.table.add('lastname', 'varchar(100)', location='after firstname')
             """
-            self.kursor.execute(f"ALTER TABLE {self._name} ADD COLUMN {column} {datatype} {location}")
+            self.kursor.execute(self._db.backend.add_column(self._name, column, datatype, location))
+            self._db.__invalidate__(self._name)
             echo.info(f"Added Column {column} To {self._name}")
 
-        def drop(self, column):
+        @ pooled(write=True)
+        def drop(self, column, renumber=False, online=False):
             """drop a column from the table
 
                ARGUMENTS:
-                    column: str: name of the new column
+                    column:   str:  name of the new column
+                    renumber: bool: renumber the primary key afterwards
+                    online:   bool: renumber through a shadow table, see renumber()
 
                USAGE:
                     db.table.drop('lastname')
+                    db.table.drop('lastname', renumber=True, online=True)
             """
             try:
                 self.kursor.execute(f'ALTER TABLE {self._name} DROP COLUMN {column}')
+                self._db.__invalidate__(self._name)
                 if self.verbose:
                     echo.info(f"Dropped column {column} from {self._name}")
-                self.renumber()
+                if renumber:
+                    self.renumber(online=online)
 
             except SQLError as error:
                 echo.alert(error)
 
+        @ pooled(write=True)
         def rename(self, column, new_name):
             """rename an column in the table"""
             try:
                 self.kursor.execute(f'ALTER TABLE {self._name} RENAME COLUMN {column} TO {new_name}')
+                self._db.__invalidate__(self._name)
                 if self.verbose:
                     echo.info(f"Column {column} has been renamed {new_name}")
 
             except SQLError as error:
                 echo.alert(error)
 
-        def renumber(self):
+        @ pooled(write=True)
+        def renumber(self, online=False, batch_size=10000, progress=None):
             """renumber all rows starting with 1. expects conventional primary key.
                fallback tries to renumber by a column named 'id' else it
                fails gracefully.
+
+               the default rebuilds the table twice with ALTER TABLE. with
+               online=True the rows are copied into a shadow table
+               batch_size rows at a time in primary key order, numbered as
+               they are copied, and the tables are swapped with one atomic
+               RENAME TABLE. each batch is committed, so the table stays
+               readable and writable during the copy. triggers record the
+               rows inserted, updated or deleted meanwhile; writes are
+               blocked with LOCK TABLES only while those rows are copied
+               again before the swap. rows deleted during the copy leave
+               gaps in the numbering. needs the TRIGGER privilege and
+               MySQL 8.0.13 or later, which can rename locked tables.
+               tables with triggers or foreign keys are refused, as the
+               shadow table would not carry them over.
+
+               ARGUMENTS:
+                    online:     bool:     copy through a shadow table
+                    batch_size: int:      rows copied per batch
+                    progress:   callable: progress(copied, total) after each batch
+
+               USAGE:
+                    db.table.renumber()
+                    db.table.renumber(online=True, batch_size=50000)
             """
             primary_key = self.primary
             try:
-                if primary_key:
+                if online and primary_key:
+                    refusal = self.__unshadowable__()
+                    if refusal:
+                        echo.alert(f"{refusal}; use renumber() without online=True")
+                        return
+
+                    self.__shadow_copy__(primary_key, batch_size, progress)
+                    if self.verbose:
+                        echo.info(f"{self._name} {primary_key} index reset online")
+                elif primary_key:
                     self.kursor.execute(f'ALTER TABLE {self._name} DROP COLUMN {primary_key}')
                     self.kursor.execute(f'ALTER TABLE {self._name} ADD COLUMN {primary_key} INT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST')
                     if self.verbose:
@@ -516,6 +1742,178 @@ class MashaDB:
             except SQLError as error:
                 echo.alert(error)
 
+            finally:
+                self._db.__invalidate__(self._name)
+
+        def __unshadowable__(self):
+            """the reason the table cannot be renumbered online, or None"""
+            db, name = self._db, self._name
+            if not db.backend.locked_rename(db.version):
+                return f"online renumber needs RENAME TABLE on locked tables, which {db.version} does not support"
+
+            own = [f"_{name}_renumber_{event}" for event in ('insert', 'update', 'delete')]
+            self.kursor.execute("SELECT COUNT(*) FROM information_schema.TRIGGERS "
+                                "WHERE EVENT_OBJECT_SCHEMA = DATABASE() AND EVENT_OBJECT_TABLE = %s "
+                                "AND TRIGGER_NAME NOT IN (%s, %s, %s)", (name, *own))
+            if self.kursor.fetchone()[0]:
+                return f"{name} has triggers, which the shadow table would not carry over"
+
+            self.kursor.execute("SELECT COUNT(*) FROM information_schema.KEY_COLUMN_USAGE "
+                                "WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL "
+                                "AND (TABLE_NAME = %s OR REFERENCED_TABLE_NAME = %s)", (name, name))
+            if self.kursor.fetchone()[0]:
+                return f"{name} has or is referenced by foreign keys, which the shadow table would not carry over"
+
+            return None
+
+        def __shadow_copy__(self, primary_key, batch_size, progress=None):
+            """copy the table into a renumbered shadow table and swap them.
+
+               triggers record the key of every row inserted, updated or
+               deleted while the copy runs and a key table maps each copied
+               key to its new number. once the copy has caught up the
+               tables are locked for writing, the rows added or changed
+               since are copied again under their new numbers and the
+               tables are swapped.
+            """
+            name = self._name
+            shadow, retired = f"_{name}_shadow", f"_{name}_retired"
+            changes, keys = f"_{name}_changes", f"_{name}_keys"
+            triggers = {event: f"_{name}_renumber_{event.lower()}" for event in ('INSERT', 'UPDATE', 'DELETE')}
+            changed = {'INSERT': '(NEW.{0})', 'UPDATE': '(OLD.{0}), (NEW.{0})', 'DELETE': '(OLD.{0})'}
+            columns = [column for column in self.columns if column != primary_key]
+            kursor, konnect = self.kursor, self._db.konnect
+
+            def cleanup():
+                for trigger in triggers.values():
+                    kursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+                kursor.execute(f"DROP TABLE IF EXISTS {shadow}, {changes}, {keys}")
+
+            cleanup()
+            kursor.execute(f"CREATE TABLE {shadow} LIKE {name}")
+            locked = False
+            try:
+                kursor.execute(f"CREATE TABLE {changes} (PRIMARY KEY (changed)) SELECT {primary_key} AS changed FROM {name} LIMIT 0")
+                kursor.execute(f"CREATE TABLE {keys} (PRIMARY KEY (old_key)) "
+                               f"SELECT {primary_key} AS old_key, {primary_key} AS new_key FROM {name} LIMIT 0")
+                for event, trigger in triggers.items():
+                    kursor.execute(f"CREATE TRIGGER {trigger} AFTER {event} ON {name} FOR EACH ROW "
+                                   f"INSERT IGNORE INTO {changes} VALUES {changed[event].format(primary_key)}")
+
+                kursor.execute(f"SELECT MIN({primary_key}) - 1, COUNT(*) FROM {name}")
+                low, total = kursor.fetchone()
+                low, copied = self.__copy_batches__(primary_key, columns, batch_size, low, 0, total, progress)
+
+                kursor.execute(f"LOCK TABLES {name} WRITE, {shadow} WRITE, {changes} WRITE, {keys} WRITE")
+                locked = True
+                low, copied = self.__copy_batches__(primary_key, columns, batch_size, low, copied, total, progress)
+
+                # rows changed after they were copied keep their new number
+                kursor.execute(f"DELETE {shadow} FROM {shadow} JOIN {keys} ON {shadow}.{primary_key} = {keys}.new_key "
+                               f"JOIN {changes} ON {changes}.changed = {keys}.old_key")
+                kursor.execute(f"INSERT INTO {shadow} ({', '.join([primary_key, *columns])}) "
+                               f"SELECT {', '.join([f'{keys}.new_key', *(f'{name}.{column}' for column in columns)])} "
+                               f"FROM {name} JOIN {keys} ON {keys}.old_key = {name}.{primary_key} "
+                               f"JOIN {changes} ON {changes}.changed = {name}.{primary_key}")
+
+                # rows added below the copied keys are numbered last
+                kursor.execute(f"INSERT INTO {shadow} ({', '.join([primary_key, *columns])}) "
+                               f"SELECT {', '.join([f'ROW_NUMBER() OVER (ORDER BY {name}.{primary_key}) + %s', *(f'{name}.{column}' for column in columns)])} "
+                               f"FROM {name} JOIN {changes} ON {changes}.changed = {name}.{primary_key} "
+                               f"LEFT JOIN {keys} ON {keys}.old_key = {name}.{primary_key} WHERE {keys}.old_key IS NULL",
+                               (copied,))
+                konnect.commit()
+
+                kursor.execute(f"RENAME TABLE {name} TO {retired}, {shadow} TO {name}")
+                kursor.execute("UNLOCK TABLES")
+                locked = False
+
+            except BaseException:
+                if locked:
+                    konnect.rollback()
+                    kursor.execute("UNLOCK TABLES")
+                cleanup()
+                raise
+
+            kursor.execute(f"DROP TABLE {retired}, {changes}, {keys}")
+
+        def __copy_batches__(self, primary_key, columns, batch_size, low, copied, total, progress=None):
+            """copy the rows above key low into the shadow table in batches,
+               numbered from copied + 1, and map their keys. returns the
+               last key copied and the number of rows copied.
+            """
+            name = self._name
+            shadow, keys = f"_{name}_shadow", f"_{name}_keys"
+            last = f"SELECT MAX({primary_key}) FROM (SELECT {primary_key} FROM {name} WHERE {primary_key} > %s ORDER BY {primary_key} LIMIT {int(batch_size)}) AS batch"
+            number = (f"INSERT INTO {keys} (old_key, new_key) SELECT {primary_key}, ROW_NUMBER() OVER (ORDER BY {primary_key}) + %s "
+                      f"FROM {name} WHERE {primary_key} > %s AND {primary_key} <= %s")
+            copy = (f"INSERT INTO {shadow} ({', '.join([primary_key, *columns])}) "
+                    f"SELECT {', '.join([f'{keys}.new_key', *(f'{name}.{column}' for column in columns)])} "
+                    f"FROM {name} JOIN {keys} ON {keys}.old_key = {name}.{primary_key} "
+                    f"WHERE {keys}.old_key > %s AND {keys}.old_key <= %s")
+            while True:
+                self.kursor.execute(last, (low,))
+                high = self.kursor.fetchone()[0]
+                if high is None:
+                    return low, copied
+
+                self.kursor.execute(number, (copied, low, high))
+                copied += self.kursor.rowcount
+                self.kursor.execute(copy, (low, high))
+                self._db.konnect.commit()
+                low = high
+                total = max(total, copied)
+                if progress is not None:
+                    progress(copied, total)
+                if self.verbose:
+                    echo.info(f"{self._name} renumber: {copied}/{total} rows copied")
+
+        def export(self, path, format='csv', workers=4, columns=None,
+                   chunk_size=10000, merge=True, partitions=None):
+            """export the table to csv, parquet or npy files in parallel.
+
+               the table is split into ranges of its integer primary key and
+               each range is streamed to its own part file by a worker
+               thread over its own connection. tables without an integer
+               primary key are exported as a single partition. raises
+               ValueError on a database that allows one connection only,
+               such as an in-memory sqlite database.
+
+               ARGUMENTS:
+                    path:       str:  output file, or directory when merge=False
+                    format:     str:  'csv' (default), 'parquet' or 'npy';
+                                      parquet needs pyarrow and npy numpy
+                    workers:    int:  number of threads and connections
+                    columns:    list: columns to export; defaults to all
+                    chunk_size: int:  rows fetched and written at a time
+                    merge:      bool: merge the parts into one file
+                    partitions: int:  key ranges; defaults to workers * 4
+
+               RETURNS:
+                    dict: rows exported, files written and elapsed seconds
+
+               USAGE:
+                    db.users.export('users.csv', workers=8)
+                    db.users.export('users.parquet', format='parquet', columns=['id', 'email'])
+                    db.users.export('users', format='npy', merge=False)
+            """
+            exporter = Exporter(self, path, format=format, workers=workers, columns=columns,
+                                chunk_size=chunk_size, merge=merge, partitions=partitions)
+            try:
+                summary = exporter.run()
+                if self.verbose:
+                    echo.info(f"Exported {summary['rows']} rows from {self._name} to {summary['path']}")
+                return summary
+
+            except SQLError as error:
+                exporter.cleanup()
+                echo.alert(error)
+
+            except BaseException:
+                exporter.cleanup()
+                raise
+
+        @ pooled(read=True)
         def record_exists(self, column, data):
             """boolean test for the existence of a record within the table
 
@@ -528,12 +1926,13 @@ class MashaDB:
                        perform some operation....
             """
             try:
-                self.kursor.execute(f"SELECT EXISTS(SELECT 1 FROM {self._name} WHERE {column}='{data}' LIMIT 1)")
-                return self.kursor.fetchone()[0]
+                kursor = self._db.__prepared__(f"SELECT EXISTS(SELECT 1 FROM {self._name} WHERE {column}=%s LIMIT 1)", (data,))
+                return kursor.fetchall()[0][0]
 
             except SQLError as error:
                 echo.alert(error)
 
+        @ pooled(read=True)
         def distinct(self, column, count=False):
             """select distinct records from specified column in the table
                returns the number of distinct records if count=True
@@ -607,39 +2006,302 @@ class MashaDB:
             def __init__(self, outer, columns):
                 self._name = outer._name
                 self._base = outer._base
+                self._db = outer._db
+                self._table = outer
                 self.columns = ', '.join(columns) if columns else '*'
 
             def __repr__(self):
                 return f"{self._base}.{self._name}.{type(self).__name__}({self.columns})"
 
-            def all(self, sort=None, limit=None):
+            @ property
+            def kursor(self):
+                return self._db.kursor
+
+            @ pooled(read=True)
+            def all(self, sort=None, limit=None, stream=False, chunk_size=1000):
                 """select all results from the selection object
 
                    ARGUMENTS:
-                        sort:  str: sort the results
-                        limit: str: limit results to a specifc number
+                        sort:       str:  sort the results
+                        limit:      str:  limit results to a specifc number
+                        stream:     bool: return a generator that fetches rows
+                                          lazily from an unbuffered cursor
+                        chunk_size: int:  rows fetched per round trip when
+                                          streaming
 
                    USAGE:
                         selection = Table.select('people')
                         results = selection.all()
                         results = selection.all(sort='people desc', limit=10)
+
+                        for row in selection.all(stream=True):
+                            process(row)
                 """
+                query, _ = self.__select__(sort=sort, limit=limit)
+                if stream:
+                    return self.__stream__(query, chunk_size=chunk_size)
+
+                def fetch():
+                    try:
+                        self.kursor.execute(query)
+                        return self.kursor.fetchall()
+
+                    except SQLError as error:
+                        echo.alert(error)
+
+                return self._db.__read__(self._name, query, (), fetch)
+
+            def __select__(self, op='and', sort=None, limit=None, **kwargs):
+                """the statement and parameters of where(**kwargs), or of
+                   all() without filters.
+                """
+                if kwargs:
+                    return compose(self._name, self.columns, kwargs, op, sort, limit)
+
                 limit = f"LIMIT {limit}" if limit else ''
                 order = f"ORDER BY {sort}" if sort else ''
-                query = f"SELECT {self.columns} FROM {self._name} {order} {limit}"
+                return f"SELECT {self.columns} FROM {self._name} {order} {limit}".strip(), ()
+
+            def iter(self, chunk_size=1000, **kwargs):
+                """stream the selection one row at a time.
+
+                   rows are pulled from an unbuffered server-side cursor
+                   chunk_size rows at a time, so the result set is never held
+                   in memory as a whole. keyword arguments are passed to
+                   where(); without filters every row is streamed.
+
+                   the connection cannot run other statements until the
+                   generator is exhausted or closed. closing the generator
+                   early discards the unread rows and releases the cursor.
+
+                   ARGUMENTS:
+                        chunk_size: int: rows fetched per round trip
+                        kwargs:          sort, limit and where() filters
+
+                   USAGE:
+                        for row in db.users.select('email').iter():
+                            process(row)
+
+                        rows = db.users.select().iter(chunk_size=5000, city='Berlin')
+                """
+                if any(key not in ('sort', 'limit') for key in kwargs):
+                    return self.where(stream=True, chunk_size=chunk_size, **kwargs)
+
+                return self.all(stream=True, chunk_size=chunk_size, **kwargs)
+
+            def __stream__(self, query, params=None, chunk_size=1000):
+                """yield rows of query from an unbuffered cursor"""
+                for _, rows in self.__chunks__(query, params, chunk_size):
+                    yield from rows
+
+            def __chunks__(self, query, params=None, chunk_size=1000):
+                """yield (column names, rows) for each fetchmany() chunk of
+                   query from an unbuffered cursor. in pooled mode the
+                   stream runs on the connection the calling thread holds,
+                   so it sees the thread's uncommitted writes, and holds its
+                   own connection from the pool only when the thread has
+                   none.
+                """
+                db = self._db
+                local = db._local
+                held = db.pool is not None and getattr(local, 'konnect', None) is not None
+                if held:
+                    # the connection stays checked out until the stream ends
+                    konnect = local.konnect
+                    local.depth = getattr(local, 'depth', 0) + 1
+                elif db.pool is not None:
+                    db._slots.acquire()
+                    try:
+                        konnect = db.pool.get_connection()
+
+                    except SQLError:
+                        db._slots.release()
+                        raise
+                else:
+                    konnect = db.konnect
+
+                kursor = db.__cursor__(konnect, buffered=False)
                 try:
-                    self.kursor.execute(query.strip())
-                    return self.kursor.fetchall()
+                    kursor.execute(query, params)
+                    names = [column[0] for column in kursor.description]
+                    rows = kursor.fetchmany(chunk_size)
+                    while rows:
+                        yield names, rows
+                        rows = kursor.fetchmany(chunk_size)
+
+                except SQLError as error:
+                    echo.alert(error)
+
+                finally:
+                    if konnect.unread_result:
+                        konnect.consume_results()
+                    kursor.close()
+                    if held:
+                        local.depth -= 1
+                        if local.depth == 0:
+                            db.__release__()
+                    elif db.pool is not None:
+                        konnect.close()
+                        db._slots.release()
+
+            def to_arrays(self, chunksize=None, **kwargs):
+                """read the selection into typed numpy columns.
+
+                   rows are fetched from an unbuffered cursor and copied
+                   chunk by chunk into columns typed from the table schema;
+                   see src/arrays.py for the type mapping. with chunksize
+                   a generator yields the columns of every chunksize rows,
+                   so memory stays bounded by the chunk.
+
+                   ARGUMENTS:
+                        chunksize: int: rows per yielded chunk
+                        kwargs:         op, sort, limit and where() filters
+
+                   RETURNS:
+                        dict: column name to numpy array, or a generator of
+                              such dicts with chunksize
+
+                   USAGE:
+                        columns = db.users.select('id', 'score').to_arrays()
+                        columns['score'].mean()
+
+                        for chunk in db.users.select().to_arrays(chunksize=100000, city='Berlin'):
+                            process(chunk)
+                """
+                if chunksize:
+                    return (columns.arrays() for columns in self.__columns__(chunksize, **kwargs))
+
+                return self.__columns__(**kwargs).arrays()
+
+            def to_numpy(self, chunksize=None, **kwargs):
+                """read the selection into a numpy structured array with one
+                   typed field per column. arguments as to_arrays().
+
+                   USAGE:
+                        records = db.users.select('id', 'name').to_numpy(id='1..1000')
+                        records['name']
+                """
+                if chunksize:
+                    return (columns.records() for columns in self.__columns__(chunksize, True, **kwargs))
+
+                return self.__columns__(structured=True, **kwargs).records()
+
+            def to_frame(self, chunksize=None, **kwargs):
+                """read the selection into a pandas DataFrame built from the
+                   typed columns of to_arrays(), or a generator of one
+                   DataFrame per chunksize rows.
+
+                   USAGE:
+                        frame = db.users.select().to_frame(city='Berlin or Paris')
+
+                        for frame in db.events.select().to_frame(chunksize=500000):
+                            process(frame)
+                """
+                if chunksize:
+                    return (columns.frame() for columns in self.__columns__(chunksize, **kwargs))
+
+                return self.__columns__(**kwargs).frame()
+
+            def __columns__(self, chunksize=None, structured=False, op='and', sort=None, limit=None, **kwargs):
+                query, params = self.__select__(op, sort, limit, **kwargs)
+                schema = self._table.schema
+                chunks = self.__chunks__(query, params, chunksize or 10000)
+                if chunksize:
+                    return chunked(chunks, schema, structured)
+
+                names = self._table.columns if self.columns == '*' else [name.strip() for name in self.columns.split(',')]
+                return collect(chunks, names, schema, min(int(limit or 10000), 10000), structured)
+
+            def paginate(self, page_size=1000, key=None, op='and', **kwargs):
+                """walk the selection one page at a time using keyset pagination.
+
+                   each page is read with WHERE key > last ORDER BY key LIMIT n,
+                   so every page costs the same no matter how deep the walk
+                   goes. pages are fetched lazily as the generator advances
+                   and no connection is held between pages.
+
+                   ARGUMENTS:
+                        page_size: int: rows per page
+                        key:       str: unique, sortable column to page by;
+                                        defaults to the primary key
+                        op:        str: logical operator between filters
+                        kwargs:    str: where() filters
+
+                   USAGE:
+                        for page in db.users.select('email').paginate(5000):
+                            process(page)
+
+                        pages = db.users.select().paginate(1000, city='Berlin or Paris')
+                """
+                key = key or self._table.primary
+                if not key:
+                    echo.alert(f"{self._name} has no primary key; pass key= to paginate")
+                    return
+
+                shape, params = split(kwargs)
+                first = keyset(self._name, self.columns, key, shape, op, page_size, first=True)
+                after = keyset(self._name, self.columns, key, shape, op, page_size)
+                page = self.__page__(first, params)
+                while page:
+                    yield [row[1:] for row in page]
+                    if len(page) < page_size:
+                        return
+
+                    page = self.__page__(after, (*params, page[-1][0]))
+
+            @ pooled()
+            def __page__(self, query, params):
+                try:
+                    return self._db.__prepared__(query, params).fetchall()
 
                 except SQLError as error:
                     echo.alert(error)
 
             def expand(self, key, value):
-                """check and process expansion syntax"""
-                result = expansions.match(value).group(0)
-                return expander[expansion_operators.search(result).group(0)](key, value)
+                """check and process expansion syntax, returns the clause
+                   and its parameters
+                """
+                return expand(key, value)
+
+            def compile(self, op='and', sort=None, limit=None, **slots):
+                """compile a where() filter into a reusable Query object.
+
+                   keyword arguments name the filtered columns; pass ... for
+                   a slot filled on each call or a value to use as default.
+                   compiled filters skip the expansion parsing and statement
+                   building for shapes and values they have already seen.
+
+                   ARGUMENTS:
+                        op:    str: logical operator between the slots
+                        sort:  str: sort the results
+                        limit: str: limit results to a specifc number
+                        slots:      column=... or column=default
+
+                   USAGE:
+                        by_city = db.users.select('email').compile(city=..., id='1..1000')
+                        by_city(city='Berlin')
+                        by_city(city='Berlin or Paris', id='+500')
+                """
+                return Query(self, op=op, sort=sort, limit=limit, **slots)
 
-            def where(self, condition=None, op='and', sort=None, limit=None, **kwargs):
+            @ pooled(read=True)
+            def __fetch__(self, query, params, stream=False, chunk_size=1000):
+                """run a parameterized SELECT, streamed or fetched in full"""
+                if stream:
+                    return self.__stream__(query, params, chunk_size=chunk_size)
+
+                def fetch():
+                    try:
+                        return self._db.__prepared__(query, params).fetchall()
+
+                    except SQLError as error:
+                        echo.alert(error)
+
+                return self._db.__read__(self._name, query, params, fetch)
+
+            @ pooled(read=True)
+            def where(self, condition=None, op='and', sort=None, limit=None,
+                      stream=False, chunk_size=1000, **kwargs):
                 """filter the Table.selection results
 
                    ARGUMENTS:
@@ -659,6 +2321,10 @@ class MashaDB:
 
                         sort:       str: sort the results
                         limit:      str: limit results to a specifc number
+                        stream:     bool: return a generator that fetches
+                                          rows lazily; see iter()
+                        chunk_size: int: rows fetched per round trip when
+                                         streaming
                         kwargs:     str: conditions as key-value pairs
 
                     USAGE:
@@ -677,6 +2343,11 @@ class MashaDB:
                         where(op='or, id='1..1000', city='berlin..london')
                         WHERE id BETWEEN 1 AND 10000 OR city BETWEEN Berlin AND London;
 
+                        values are sent as bound parameters. with a
+                        statement_cache, repeating a filter shape with new
+                        values reuses the statement prepared by the first
+                        call.
+
                         pre-format where clauses
                         clause_1 = {'city': 'Berlin', 'sort': 'city', 'limit': 10}
                         clause_2 = {'logic': 'or', 'people': 'Al or Bob', 'city': 'Berlin..London'}
@@ -684,33 +2355,12 @@ class MashaDB:
                         db.table.select('people').where(**clause_1)
                         db.table.select('people').where(**clause_2)
                 """
-                if condition:
-                    query = f"SELECT {self.columns} FROM {self._name} WHERE {condition}"
-                    self.kursor.execute(query.strip())
-                    return self.kursor.fetchall()
+                query, params = self.__where__(condition, op, sort, limit, **kwargs)
+                return self.__fetch__(query, params, stream=stream, chunk_size=chunk_size)
 
-                limit = f"LIMIT {limit}" if limit else ''
-                order = f"ORDER BY {sort}" if sort else ''
-                statements = []
-                conditions = []
-                for key, value in kwargs.items():
-                    values = logic.split(value)
-                    for value in values:
-                        if expansions.match(value):
-                            clause = self.expand(key, value)
-                            statements.append(clause)
-                        else:
-                            clause = f"{key}='{value}'"
-                            statements.append(clause)
-                    statement = ' OR '.join(statements)
-                    conditions.append(statement)
-                    statements.clear()
-
-                chain = f' {op} '.join(conditions)
-                query = f"SELECT {self.columns} FROM {self._name} WHERE {chain} {order} {limit}"
-                try:
-                    self.kursor.execute(query.strip())
-                    return self.kursor.fetchall()
+            def __where__(self, condition=None, op='and', sort=None, limit=None, **kwargs):
+                """the statement and parameters of where()"""
+                if condition:
+                    return f"SELECT {self.columns} FROM {self._name} WHERE {condition}".strip(), ()
 
-                except SQLError as error:
-                    echo.alert(error)
+                return compose(self._name, self.columns, kwargs, op, sort, limit)
@@ -0,0 +1,246 @@
+"""statement pipelining: many statements per round trip
+
+   inside db.pipeline() the Table and Selector calls of a handler are
+   queued instead of executed; each returns a Result that is filled in
+   once the pipeline is sent. send() packs the queued statements into
+   multi statement queries of up to max_statements statements and the
+   server's max_allowed_packet, runs each in one round trip and returns
+   the results in the order the calls were made. leaving a with block
+   sends the pipeline; an exception discards it.
+
+   queued statements run in the current transaction like any other
+   write and are committed by db.commit(). a statement that fails stops
+   the pipeline: its Result holds the error and the statements queued
+   after it are not run.
+
+   USAGE:
+        with db.pipeline() as pipe:
+            user = pipe.users.select('name', 'email').where(id=7)
+            orders = pipe.orders.select().where(user_id=7, sort='id desc', limit=10)
+            pipe.visits.write(user_id=7, page='/home')
+
+        user.value, orders.value
+
+        pipe = db.pipeline()
+        pipe.users.rows
+        pipe.users.distinct('city')
+        count, cities = pipe.send()
+"""
+from itertools import chain
+
+from mysql.connector import Error as SQLError
+
+from src.utilities import echo
+from src.utilities import packed
+
+
+class Result:
+    """the pending result of one queued statement"""
+
+    def __init__(self, statement, params=(), shape=None):
+        self.statement = statement
+        self.params = params
+        self.shape = shape
+        self.value = None
+        self.error = None
+        self.done = False
+
+    def __repr__(self):
+        state = f"error={self.error!r}" if self.error else f"value={self.value!r}" if self.done else 'pending'
+        return f"{type(self).__name__}({self.statement!r}, {state})"
+
+    def resolve(self, value):
+        self.value = self.shape(value) if self.shape is not None else value
+        self.done = True
+
+    def fail(self, error):
+        self.error = str(error)
+        self.done = True
+
+
+def scalar(rows):
+    """the first value of the first row"""
+    return rows[0][0] if rows else None
+
+
+def flatten(rows):
+    """the values of a one column result"""
+    return tuple(chain(*rows))
+
+
+class Pipeline:
+    """queued statements of one thread; created by MashaDB.pipeline().
+       tables are reached as attributes, as on the database object.
+    """
+
+    def __init__(self, db, max_statements=100):
+        self._db = db
+        self.max_statements = max(1, max_statements)
+        self.queued = []
+        self.written = set()
+
+    def __repr__(self):
+        return f"{type(self).__name__}(queued={len(self.queued)}, max_statements={self.max_statements})"
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        return Table(self, getattr(self._db, name))
+
+    def __len__(self):
+        return len(self.queued)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        if exc_type is None:
+            self.send()
+        else:
+            self.discard()
+
+    def __queue__(self, statement, params=(), shape=None, table=None):
+        """queue a statement; table names the table it writes"""
+        result = Result(statement, tuple(params), shape)
+        self.queued.append(result)
+        if table is not None:
+            self.written.add(table)
+
+        return result
+
+    def execute(self, query, params=()):
+        """queue any statement. its value is the fetched rows, or the
+           number of affected rows for statements without a result.
+        """
+        verb = query.lstrip().split(' ', 1)[0].upper()
+        if verb in ('ALTER', 'CREATE', 'DROP', 'RENAME'):
+            raise ValueError(f"{verb} statements cannot be pipelined")
+
+        reads = ('SELECT', 'SHOW', 'DESC', 'DESCRIBE', 'EXPLAIN')
+        return self.__queue__(query, params, table=None if verb in reads else '')
+
+    def discard(self):
+        """drop the queued statements"""
+        self.queued = []
+        self.written = set()
+
+    def send(self):
+        """run the queued statements, returns their values in order"""
+        if not self.queued:
+            return []
+
+        # imported here as src.mashadb imports this module
+        from src.mashadb import pooled
+
+        queued, written = self.queued, self.written
+        self.discard()
+        send = pooled(write=bool(written))(type(self).__send__)
+        send(self, queued, written)
+        return [result.value for result in queued]
+
+    def __trips__(self, queued):
+        """split the queued results into round trips"""
+        budget = self._db.max_packet - 1024
+        trip, size = [], 0
+        for result in queued:
+            length = len(result.statement.encode()) + sum(map(packed, result.params)) + 2
+            if trip and (len(trip) >= self.max_statements or size + length > budget):
+                yield trip
+                trip, size = [], 0
+
+            trip.append(result)
+            size += length
+
+        if trip:
+            yield trip
+
+    def __send__(self, queued, written):
+        db = self._db
+        trips = 0
+        try:
+            for trip in self.__trips__(queued):
+                trips += 1
+                statements = [(result.statement, result.params) for result in trip]
+                try:
+                    for result, value in zip(trip, db.backend.pipeline(db.kursor, statements)):
+                        result.resolve(value)
+
+                except SQLError as error:
+                    echo.alert(error)
+                    failed = next((result for result in trip if not result.done), None)
+                    if failed is not None:
+                        failed.fail(error)
+                    break
+
+        finally:
+            skipped = [result for result in queued if not result.done]
+            for result in skipped:
+                result.fail('not run: an earlier statement of the pipeline failed')
+
+            # '' marks a raw statement whose tables are unknown
+            if '' in written:
+                db.__invalidate__(schema=False)
+            elif written:
+                db.__invalidate__(*written, schema=False)
+
+        if db.verbose:
+            ran = sum(result.error is None for result in queued)
+            echo.info(f"Pipeline ran {ran} of {len(queued)} statement(s) in {trips} round trip(s)")
+
+
+class Table:
+    """queues the statements of the Table API for one table"""
+
+    def __init__(self, pipeline, table):
+        self._pipeline = pipeline
+        self._table = table
+        self._name = table._name
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._name})"
+
+    def __queue__(self, statement, params=(), shape=None, write=False):
+        return self._pipeline.__queue__(statement, params, shape, self._name if write else None)
+
+    @property
+    def rows(self):
+        return self.__queue__(f"SELECT COUNT(*) FROM {self._name}", shape=scalar)
+
+    def write(self, **kwargs):
+        return self.__queue__(*self._table.__insert__(kwargs), write=True)
+
+    def update(self, id, **kwargs):
+        return self.__queue__(*self._table.__update__(id, kwargs), write=True)
+
+    def delete(self, id, value):
+        return self.__queue__(f"DELETE FROM {self._name} WHERE {id}=%s", (value,), write=True)
+
+    def record_exists(self, column, data):
+        return self.__queue__(f"SELECT EXISTS(SELECT 1 FROM {self._name} WHERE {column}=%s LIMIT 1)", (data,), shape=scalar)
+
+    def distinct(self, column, count=False):
+        if count:
+            return self.__queue__(f"SELECT COUNT(DISTINCT {column}) FROM {self._name}", shape=scalar)
+
+        return self.__queue__(f"SELECT DISTINCT {column} FROM {self._name}", shape=flatten)
+
+    def select(self, *columns):
+        return Selector(self, self._table.select(*columns))
+
+
+class Selector:
+    """queues the statements of the Selector API"""
+
+    def __init__(self, table, selector):
+        self._table = table
+        self._selector = selector
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._selector.columns})"
+
+    def all(self, sort=None, limit=None):
+        return self._table.__queue__(*self._selector.__select__(sort=sort, limit=limit), shape=list)
+
+    def where(self, condition=None, op='and', sort=None, limit=None, **kwargs):
+        return self._table.__queue__(*self._selector.__where__(condition, op, sort, limit, **kwargs), shape=list)
@@ -0,0 +1,126 @@
+"""compiled filters for the where() expansion syntax
+
+   a where() call is split into its shape, the sql clauses produced by
+   the expansion syntax, and its parameters. both halves are cached at
+   module level: parse() remembers the expansion of each column value
+   and template() remembers the SELECT statement built for each shape,
+   so repeating a filter with known values does no regex work and no
+   string building.
+
+   USAGE:
+        q = db.users.select('email').compile(city=..., id='1..1000')
+        q(city='Berlin')
+        q(city='Berlin or Paris', id='+500')
+"""
+from functools import lru_cache
+
+from src.utilities import logic, expand
+
+
+@lru_cache(maxsize=4096)
+def parse(key, value):
+    """expand one where() value, returns (clauses, params)"""
+    clauses, params = [], []
+    for alternative in logic.split(value):
+        clause, bound = expand(key, alternative)
+        clauses.append(clause)
+        params.extend(bound)
+
+    return tuple(clauses), tuple(params)
+
+
+def condition(shape, op='and'):
+    """join the clauses of a filter shape into one WHERE condition"""
+    conditions = [f"({' OR '.join(clauses)})" if len(clauses) > 1 else clauses[0] for clauses in shape]
+    return f' {op} '.join(conditions)
+
+
+@lru_cache(maxsize=1024)
+def template(table, columns, shape, op='and', sort=None, limit=None):
+    """build the SELECT statement for a filter shape"""
+    limit = f"LIMIT {limit}" if limit else ''
+    order = f"ORDER BY {sort}" if sort else ''
+    return f"SELECT {columns} FROM {table} WHERE {condition(shape, op)} {order} {limit}".strip()
+
+
+@lru_cache(maxsize=256)
+def keyset(table, columns, key, shape, op='and', size=1000, first=False):
+    """build the SELECT statement for one keyset page. the key is selected
+       as the first column; every page but the first starts after the
+       previous key. MySQL does not allow a bare * after another column,
+       so every column is selected as table.*.
+    """
+    if columns == '*':
+        columns = f"{table}.*"
+
+    conditions = [f"({condition(shape, op)})"] if shape else []
+    if not first:
+        conditions.append(f"{key} > %s")
+
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+    return f"SELECT {key}, {columns} FROM {table} {where}ORDER BY {key} LIMIT {int(size)}"
+
+
+def split(filters):
+    """returns the shape and parameters of where(**filters)"""
+    shape, params = [], []
+    for key, value in filters.items():
+        clauses, bound = parse(key, str(value))
+        shape.append(clauses)
+        params.extend(bound)
+
+    return tuple(shape), params
+
+
+def compose(table, columns, filters, op='and', sort=None, limit=None):
+    """returns the statement and parameters for where(**filters)"""
+    shape, params = split(filters)
+    return template(table, columns, shape, op, sort, limit), params
+
+
+class Query:
+    """a where() filter compiled once and executed many times.
+
+       keyword arguments name the filtered columns. a value of ... marks
+       a slot that must be filled on every call; any other value is the
+       default for its slot. calling the query binds the values, looks
+       up the cached template for their shape and executes it with the
+       values as bound parameters.
+
+       USAGE:
+            q = db.users.select('email').compile(city=..., id='1..1000')
+            rows = q(city='Berlin')
+            rows = q(city='London', id='+100', stream=True)
+    """
+
+    def __init__(self, selector, op='and', sort=None, limit=None, **slots):
+        self.selector = selector
+        self.op = op
+        self.sort = sort
+        self.limit = limit
+        self.slots = slots
+        defaults = {key: value for key, value in slots.items() if value is not ...}
+        if len(defaults) == len(slots):
+            self.bind(**defaults)
+
+    def __repr__(self):
+        slots = ', '.join(f"{key}={'...' if value is ... else repr(value)}" for key, value in self.slots.items())
+        return f"{type(self).__name__}({self.selector!r}, {slots})"
+
+    def __call__(self, stream=False, chunk_size=1000, **values):
+        statement, params = self.bind(**values)
+        return self.selector.__fetch__(statement, params, stream=stream, chunk_size=chunk_size)
+
+    def bind(self, **values):
+        """fill the slots with values, returns (statement, params)"""
+        unknown = set(values) - set(self.slots)
+        if unknown:
+            raise TypeError(f"unknown slot(s): {', '.join(sorted(unknown))}")
+
+        filters = {key: values.get(key, default) for key, default in self.slots.items()}
+        missing = [key for key, value in filters.items() if value is ...]
+        if missing:
+            raise TypeError(f"missing value for slot(s): {', '.join(missing)}")
+
+        selector = self.selector
+        return compose(selector._name, selector.columns, filters, self.op, self.sort, self.limit)
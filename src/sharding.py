@@ -0,0 +1,401 @@
+"""tables split across several MashaDB servers
+
+   ShardedMashaDB holds one MashaDB per shard and a shard key per table:
+   a column and a function that maps its value to the index of a shard.
+   hashed() spreads values evenly by the crc32 of their string form;
+   ranged() sends each range of values between sorted bounds to its own
+   shard.
+
+   write(), write_many(), update() and delete() run on the shard of the
+   key value; update() and delete() run on every shard when they are not
+   given the key. reads run on every shard in parallel through a thread
+   pool and their results are merged: with sort the sorted results of
+   the shards are merged in a k-way merge and cut to limit, so each shard
+   returns at most limit rows. strings are merged in the default
+   collation of the backend, case and accent insensitive on MySQL and
+   MariaDB; sort columns declared with another collation may merge out
+   of order. a where() that names the key with plain values, e.g.
+   where(user_id=7) or where(user_id='7 or 9'), reads only the shards
+   of those values.
+
+   each shard commits its own transaction; a commit that fails on one
+   shard does not roll back the others. in pooled mode reads run on the
+   worker threads' connections and do not see the caller's uncommitted
+   writes.
+
+   USAGE:
+        db = ShardedMashaDB([{'host': 'shard0'}, {'host': 'shard1'}],
+                            tables={'orders': 'user_id'}, pool_size=8, **config)
+        db.connect()
+        db.orders.write(user_id=7, total=12.5)
+        db.commit()
+
+        db.orders.select('id', 'total').where(user_id=7)          one shard
+        db.orders.select('id', 'total').all(sort='total desc', limit=10)
+
+        db.shard_key('events', 'day', ranged(['2024-01-01', '2025-01-01']))
+"""
+import heapq
+import zlib
+from bisect import bisect_right
+from itertools import chain, islice
+from concurrent.futures import ThreadPoolExecutor
+
+from src.mashadb import MashaDB
+from src.query import parse
+from src.boundinnerclass import BoundInnerClass
+
+
+def hashed(value, shards):
+    """the shard of value by the crc32 of its string form, so that 7 and
+       '7' share a shard.
+    """
+    return zlib.crc32(str(value).encode()) % shards
+
+
+def ranged(bounds):
+    """a shard key function that sends values below bounds[0] to shard 0,
+       values from bounds[0] below bounds[1] to shard 1 and so on. there
+       is one bound fewer than shards.
+    """
+    bounds = sorted(bounds)
+
+    def shard(value, shards):
+        if not isinstance(value, type(bounds[0])):
+            value = type(bounds[0])(value)
+        return min(bisect_right(bounds, value), shards - 1)
+
+    return shard
+
+
+def ordering(sort):
+    """the columns and directions of an ORDER BY clause"""
+    order = []
+    for part in sort.split(','):
+        column, _, direction = part.strip().partition(' ')
+        order.append((column, direction.strip().lower() == 'desc'))
+
+    return order
+
+
+class Ordered:
+    """sort key of a row for the k-way merge. NULL sorts first, as in
+       an ascending ORDER BY; strings compare by collate(value), the
+       collation of the server that sorted them.
+    """
+    __slots__ = ('values', 'descending')
+
+    def __init__(self, values, descending, collate):
+        self.values = [(value is not None, collate(value) if isinstance(value, str) else value) for value in values]
+        self.descending = descending
+
+    def __lt__(self, other):
+        for mine, theirs, descending in zip(self.values, other.values, self.descending):
+            if mine != theirs:
+                return mine > theirs if descending else mine < theirs
+
+        return False
+
+
+class ShardedMashaDB:
+    """tables split across several MashaDB servers
+
+       USAGE:
+            db = ShardedMashaDB([{'host': 'shard0'}, {'host': 'shard1'}],
+                                tables={'orders': 'user_id'}, **config)
+            db.connect()
+            db.orders.write(user_id=7, total=12.5)
+            db.commit()
+            rows = db.orders.select('total').all(sort='total desc', limit=10)
+            db.closeall()
+    """
+
+    def __init__(self, shards, tables=None, workers=None, **kwargs):
+        """ ARGUMENTS:
+                shards:  list: configs merged over the keyword arguments,
+                               or MashaDB objects
+                tables:  dict: table name to its key column, or to a
+                               (column, function) pair; function(value,
+                               shards) returns a shard index and defaults
+                               to hashed
+                workers: int:  threads that read the shards in parallel;
+                               defaults to one per shard
+
+                every other keyword argument is passed to the MashaDB of
+                each shard.
+
+            USAGE:
+                db = ShardedMashaDB([{'port': 3306}, {'port': 3307}], tables={'users': 'id'}, **config)
+                db = ShardedMashaDB(shards, tables={'events': ('day', ranged(['2025-01-01']))})
+        """
+        self.verbose = True
+        self.shards = [shard if isinstance(shard, MashaDB) else MashaDB(**{**kwargs, **shard}) for shard in shards]
+        if not self.shards:
+            raise ValueError('ShardedMashaDB needs at least one shard')
+
+        self.keys = {}
+        for table, key in (tables or {}).items():
+            self.shard_key(table, *((key,) if isinstance(key, str) else key))
+
+        self.executor = ThreadPoolExecutor(max_workers=workers or len(self.shards), thread_name_prefix='masha-shard')
+
+    def __repr__(self):
+        return f"{type(self).__name__}(shards={len(self.shards)}, tables={list(self.keys)})"
+
+    def __getattr__(self, name):
+        """bind the tables of the first shard as attributes on first access"""
+        if name.startswith('_') or 'shards' not in self.__dict__:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        getattr(self.shards[0], name)
+        table = self.Table(name)
+        setattr(self, name, table)
+        return table
+
+    def __enter__(self):
+        self.verbose = False
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.commit()
+        self.closeall()
+
+    def shard_key(self, table, column, function=hashed):
+        """shard table by column; function(value, shards) picks the shard"""
+        self.keys[table] = (column, function)
+
+    def __shard__(self, table, value):
+        """the shard holding the key value of a table"""
+        column, function = self.keys[table]
+        return self.shards[function(value, len(self.shards))]
+
+    def __fan_out__(self, call, shards=None):
+        """call(shard) on every shard in parallel, returns the results in
+           shard order.
+        """
+        shards = self.shards if shards is None else shards
+        if len(shards) == 1:
+            return [call(shards[0])]
+
+        return list(self.executor.map(call, shards))
+
+    def __each__(self, call):
+        """call(shard) on every shard in turn on the calling thread"""
+        return [call(shard) for shard in self.shards]
+
+    def connect(self, database=None):
+        for shard in self.shards:
+            shard.verbose = self.verbose
+            shard.connect(database)
+
+    def commit(self):
+        """commit the transaction of every shard"""
+        self.__each__(lambda shard: shard.commit())
+
+    def rollback(self):
+        """roll back the transaction of every shard"""
+        self.__each__(lambda shard: shard.rollback())
+
+    def closeall(self):
+        """close every shard and the reader threads"""
+        self.__each__(lambda shard: shard.closeall())
+        self.executor.shutdown(wait=True)
+
+    def execute(self, query):
+        """execute a statement on every shard, returns the result of each"""
+        return self.__each__(lambda shard: shard.execute(query))
+
+    def create(self, table: str, **kwargs: str) -> None:
+        """create a table on every shard; see MashaDB.create"""
+        self.__each__(lambda shard: shard.create(table, **kwargs))
+        self.__dict__.pop(table, None)
+
+    def drop(self, table):
+        """drop a table on every shard"""
+        self.__each__(lambda shard: shard.drop(table))
+        self.__dict__.pop(table, None)
+
+    @ BoundInnerClass
+    class Table:
+        """a table split across the shards; see MashaDB.Table"""
+
+        def __init__(self, outer, tablename):
+            self._name = tablename
+            self._db = outer
+
+        def __repr__(self):
+            return f"{type(self._db).__name__}.{type(self).__name__}({self._name})"
+
+        def __str__(self):
+            return self._name
+
+        @ property
+        def key(self):
+            """the shard key column; raises ValueError for unsharded tables"""
+            try:
+                return self._db.keys[self._name][0]
+
+            except KeyError:
+                raise ValueError(f"no shard key for table {self._name}; use shard_key()") from None
+
+        @ property
+        def columns(self):
+            return getattr(self._db.shards[0], self._name).columns
+
+        @ property
+        def primary(self):
+            return getattr(self._db.shards[0], self._name).primary
+
+        @ property
+        def rows(self):
+            return sum(self._db.__fan_out__(lambda shard: getattr(shard, self._name).rows or 0))
+
+        def __table__(self, shard):
+            return getattr(shard, self._name)
+
+        def write(self, **kwargs):
+            """insert a row into the shard of its key value"""
+            if self.key not in kwargs:
+                raise ValueError(f"write() to {self._name} needs its shard key {self.key}")
+
+            return self.__table__(self._db.__shard__(self._name, kwargs[self.key])).write(**kwargs)
+
+        def write_many(self, rows, columns=None, batch_size=1000):
+            """insert rows, each into the shard of its key value. the rows
+               of each shard are written once batch_size of them are
+               collected, so a generator is streamed. returns the number
+               of rows inserted by each batch.
+            """
+            key, groups, counts = self.key, {}, []
+            index = None
+            for row in rows:
+                if isinstance(row, dict):
+                    value = row[key]
+                else:
+                    if index is None:
+                        index = list(columns or self.columns).index(key)
+                    value = row[index]
+
+                shard = self._db.__shard__(self._name, value)
+                group = groups.setdefault(shard, [])
+                group.append(row)
+                if len(group) >= batch_size:
+                    counts.append(self.__table__(shard).write_many(group, columns=columns, batch_size=batch_size))
+                    groups[shard] = []
+
+            counts.extend(self.__table__(shard).write_many(group, columns=columns, batch_size=batch_size)
+                          for shard, group in groups.items() if group)
+            return list(chain.from_iterable(count or () for count in counts))
+
+        def update(self, id, **kwargs):
+            """update the row with primary key id. runs on the shard of id
+               when the table is sharded by its primary key, else on every
+               shard.
+            """
+            if self.key == self.primary:
+                return self.__table__(self._db.__shard__(self._name, id)).update(id, **kwargs)
+
+            self._db.__each__(lambda shard: self.__table__(shard).update(id, **kwargs))
+
+        def delete(self, id, value):
+            """delete the rows whose column id equals value. runs on the
+               shard of value when id is the shard key, else on every shard.
+            """
+            if id == self.key:
+                return self.__table__(self._db.__shard__(self._name, value)).delete(id, value)
+
+            self._db.__each__(lambda shard: self.__table__(shard).delete(id, value))
+
+        def record_exists(self, column, data):
+            """boolean test for a record on any shard"""
+            if column == self._db.keys.get(self._name, (None,))[0]:
+                return self.__table__(self._db.__shard__(self._name, data)).record_exists(column, data)
+
+            return int(any(self._db.__fan_out__(lambda shard: self.__table__(shard).record_exists(column, data))))
+
+        def distinct(self, column, count=False):
+            """distinct values of a column across the shards. strings that
+               the collation of the backend holds equal are one value and
+               count=True leaves out NULL, as COUNT(DISTINCT) does.
+            """
+            collate = self._db.shards[0].backend.collate
+            values = self._db.__fan_out__(lambda shard: self.__table__(shard).distinct(column) or ())
+            merged = {}
+            for value in chain.from_iterable(values):
+                merged.setdefault(collate(value) if isinstance(value, str) else value, value)
+
+            if count:
+                return len(merged) - (None in merged)
+
+            return tuple(merged.values())
+
+        def select(self, *columns: str):
+            """create a Selector for the columns, or for every column"""
+            return self.Selector(columns)
+
+        @ BoundInnerClass
+        class Selector:
+            """a selection read from every shard and merged"""
+
+            def __init__(self, outer, columns):
+                self._name = outer._name
+                self._db = outer._db
+                self._table = outer
+                self.columns = list(columns)
+
+            def __repr__(self):
+                return f"{self._name}.{type(self).__name__}({', '.join(self.columns) or '*'})"
+
+            def __targets__(self, op, kwargs):
+                """the shards that can hold rows matching the filters, or
+                   None for every shard.
+                """
+                key = self._db.keys.get(self._name, (None,))[0]
+                if key not in kwargs or (op.lower() != 'and' and len(kwargs) > 1):
+                    return None
+
+                clauses, values = parse(key, str(kwargs[key]))
+                if any(clause != f"{key}=%s" for clause in clauses):
+                    return None
+
+                shards = [self._db.__shard__(self._name, value) for value in values]
+                return list(dict.fromkeys(shards))
+
+            def __read__(self, read, sort=None, limit=None, shards=None):
+                """run read(selector) on the shards and merge the results"""
+                columns, order, extra = self.columns, [], 0
+                if sort:
+                    order = ordering(sort)
+                    names = columns or list(self._table.columns)
+                    missing = [column for column, _ in order if column not in names]
+                    if missing:
+                        # sort columns outside of the selection are read and cut off again
+                        columns = names = names + missing
+                        extra = len(missing)
+                    positions = [names.index(column) for column, _ in order]
+
+                results = self._db.__fan_out__(lambda shard: read(getattr(shard, self._name).select(*columns)) or [],
+                                               shards)
+                if order:
+                    descending = [descending for _, descending in order]
+                    collate = self._db.shards[0].backend.collate
+                    rows = heapq.merge(*results, key=lambda row: Ordered([row[index] for index in positions],
+                                                                         descending, collate))
+                else:
+                    rows = chain.from_iterable(results)
+
+                rows = islice(rows, int(limit)) if limit else rows
+                return [row[:-extra] for row in rows] if extra else list(rows)
+
+            def all(self, sort=None, limit=None):
+                """select all results from every shard, merged in sort order"""
+                return self.__read__(lambda selector: selector.all(sort=sort, limit=limit), sort, limit)
+
+            def where(self, condition=None, op='and', sort=None, limit=None, **kwargs):
+                """filter the selection on every shard, or only on the shards
+                   of the key values when the filters name the shard key.
+                """
+                shards = None if condition else self.__targets__(op, kwargs)
+                return self.__read__(lambda selector: selector.where(condition, op, sort, limit, **kwargs),
+                                     sort, limit, shards)
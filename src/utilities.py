@@ -57,26 +57,81 @@ def multisub(characters, string):
     return regex.sub(lambda match: characters[match.group(0)], string)
 
 
+def packed(value):
+    """the most bytes a statement parameter can take in a packet sent to
+       the server: strings and binaries are measured in bytes and counted
+       twice, as escaping may double them, plus quotes and separator.
+    """
+    if isinstance(value, str):
+        return 2 * len(value.encode()) + 4
+
+    if isinstance(value, (bytes, bytearray)):
+        return 2 * len(value) + 4
+
+    return len(str(value)) + 4
+
+
+def tabulate(rows, index):
+    """format rows as left aligned text columns preceded by an index label.
+
+       USAGE:
+           tabulate([('id', 'name'), ('int', 'varchar(40)')], ['COLUMNS:', 'TYPES:'])
+    """
+    index = [str(label) for label in index]
+    rows = [[str(value) for value in row] for row in rows]
+    table = [[label, *row] for label, row in zip(index, rows)]
+    widths = [max(map(len, column)) for column in zip(*table)]
+    lines = ['  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in table]
+    return '\n'.join(lines)
+
+
 # Syntax Expansion Utilities
 logic = re.compile(r'\sor\s', re.IGNORECASE)
 expansion_operators = re.compile(r'(\+|-|%|\.\.)')
 expansions = re.compile(r'(^%.+|.+%$|^.+%.+$|.*?\.\..*|^[+-].+)')
 
 
+# each expansion returns an sql clause with %s placeholders and the
+# list of parameters bound to them.
+
 def expComp(key, value):
     """Exapand Comparison Operators"""
-    return f"{key}{multisub({'+': ' >= ', '-': ' <= '}, value)}"
+    operator = {'+': '>=', '-': '<='}[value[0]]
+    return f"{key} {operator} %s", [value[1:]]
 
 
 def expRange(key, value):
     """Expand a range of values to MySQL BETWEEN statement"""
     low, high = value.split('..')
-    return f"{key} BETWEEN '{low}' AND '{high}'"
+    return f"{key} BETWEEN %s AND %s", [low, high]
 
 
 def expLike(key, value):
     """Expand SQL wildcard characters to LIKE statement"""
-    return f"{key} LIKE '{value}'"
+    return f"{key} LIKE %s", [value]
+
+
+def expEqual(key, value):
+    """Expand a plain value to an equality test"""
+    return f"{key}=%s", [value]
 
 
 expander = {'+': expComp, '-': expComp, '%': expLike, '..': expRange}
+
+
+def expand(key, value):
+    """Expand one value of the where() syntax to a clause and its parameters.
+       a range takes precedence over a leading comparison sign, which takes
+       precedence over wildcards: '2020-01-01..2020-01-05' is a range and
+       'jean-luc%' a LIKE pattern.
+    """
+    if not expansions.match(value):
+        return expEqual(key, value)
+
+    if '..' in value:
+        return expander['..'](key, value)
+
+    if value[0] in '+-':
+        return expander[value[0]](key, value)
+
+    return expander['%'](key, value)
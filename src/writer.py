@@ -0,0 +1,207 @@
+"""write-behind buffer for single row writes
+
+   a BufferedWriter takes rows from the calling threads and returns at
+   once; a background thread drains its queue over a dedicated
+   connection, coalescing the rows into multi-row INSERT statements of
+   up to max_rows rows. a batch is written when it is full or when its
+   oldest row has waited max_latency_ms, and committed as one
+   transaction, so the caller's latency no longer depends on the
+   server's.
+
+   the queue holds at most max_queue rows. when it is full write()
+   blocks until the thread catches up, or raises queue.Full once
+   timeout seconds have passed. a batch that fails is rolled back and
+   passed to on_error with its rows; the thread carries on with the
+   next batch.
+
+   flush() waits until every row written before it is committed.
+   close() drains the queue and stops the thread; MashaDB.closeall()
+   and leaving a with block close every open writer of the database.
+
+   USAGE:
+        writer = db.events.buffered_writer(max_rows=500, max_latency_ms=20)
+        writer.write(user=1, action='login')
+        writer.flush()
+        writer.close()
+
+        with db.events.buffered_writer(on_error=log_failed) as writer:
+            for row in rows:
+                writer.write(**row)
+"""
+import time
+import queue
+import threading
+from itertools import chain
+from contextlib import suppress
+
+from mysql.connector import Error as SQLError
+
+from src.utilities import echo
+
+# queued by close() to stop the thread once the rows before it are written
+STOP = object()
+
+
+class BufferedWriter:
+    """write-behind buffer of one table; created by Table.buffered_writer()"""
+
+    def __init__(self, table, max_rows=1000, max_latency_ms=50, max_queue=10000, timeout=None, on_error=None):
+        table._db.__concurrent__('buffered_writer')
+        self.table = table
+        self.db = table._db
+        self.max_rows = max(1, max_rows)
+        self.max_latency = max_latency_ms / 1000
+        self.timeout = timeout
+        self.on_error = on_error
+        self.budget = self.db.max_packet - 1024
+        self.queue = queue.Queue(max_queue)
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.closed = False
+        self.konnect = None
+        self.kursor = None
+        self.thread = threading.Thread(target=self.__drain__, name=f"masha-writer-{table._name}", daemon=True)
+        self.thread.start()
+        self.db._writers.append(self)
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(table={self.table._name}, max_rows={self.max_rows}, "
+                f"queued={self.queue.qsize()}, written={self.written}, failed={self.failed})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.close()
+
+    def write(self, **kwargs):
+        """queue one row; blocks while the queue is full"""
+        if self.closed:
+            raise RuntimeError(f"the buffered writer of {self.table._name} is closed")
+
+        self.queue.put(kwargs, timeout=self.timeout)
+
+    def write_many(self, rows):
+        """queue every row of an iterable of dicts"""
+        for row in rows:
+            self.write(**row)
+
+    def flush(self, timeout=None):
+        """wait until every row queued so far is written. returns False
+           when timeout seconds pass first.
+        """
+        if self.closed:
+            return True
+
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """write the queued rows, stop the thread and close its connection"""
+        if self.closed:
+            return
+
+        self.closed = True
+        self.queue.put(STOP)
+        self.thread.join()
+        with suppress(ValueError):
+            self.db._writers.remove(self)
+
+        if self.table.verbose:
+            echo.info(f"{self.written} records written to {self.table._name} in {self.batches} batch(es)"
+                      f"{f', {self.failed} failed' if self.failed else ''}")
+
+    def stats(self):
+        return {'queued': self.queue.qsize(), 'written': self.written, 'failed': self.failed, 'batches': self.batches}
+
+    def __drain__(self):
+        """the background thread: collect rows into batches until stopped"""
+        try:
+            stop = False
+            while not stop:
+                rows, flushes = [], []
+                item = self.queue.get()
+                deadline = time.monotonic() + self.max_latency
+                while True:
+                    if item is STOP:
+                        stop = True
+                        break
+
+                    if isinstance(item, threading.Event):
+                        flushes.append(item)
+                        break
+
+                    rows.append(item)
+                    if len(rows) >= self.max_rows:
+                        break
+
+                    try:
+                        item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+
+                    except queue.Empty:
+                        break
+
+                if rows:
+                    self.__write__(rows)
+
+                for done in flushes:
+                    done.set()
+
+        finally:
+            self.__disconnect__()
+
+    def __groups__(self, rows):
+        """rows grouped by their columns, in order of first appearance"""
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(row), []).append(row)
+
+        return groups.items()
+
+    def __write__(self, rows):
+        """insert and commit one batch of rows"""
+        db, name = self.db, self.table._name
+        try:
+            if self.konnect is None:
+                self.konnect = db.__connection__()
+                self.kursor = db.__cursor__(self.konnect, buffered=True)
+
+            for columns, group in self.__groups__(rows):
+                head = db.backend.insert(name, columns, ignore=True)
+                row = f"({('%s, ' * len(columns)).strip(', ')})"
+                batch_size = self.table.__batch_size__(self.max_rows, len(columns))
+                for batch in self.table.__batches__(group, columns, batch_size, self.budget - len(head)):
+                    self.kursor.execute(f"{head}{', '.join([row] * len(batch))}", tuple(chain.from_iterable(batch)))
+
+            self.konnect.commit()
+            self.written += len(rows)
+
+        except SQLError as error:
+            self.failed += len(rows)
+            self.__disconnect__(rollback=True)
+            try:
+                if self.on_error is None:
+                    echo.alert(f"buffered write to {name} failed: {error}")
+                else:
+                    self.on_error(error, rows)
+
+            except Exception as failure:
+                echo.alert(f"on_error of the buffered writer of {name} failed: {failure}")
+
+        finally:
+            self.batches += 1
+            db.__invalidate__(name, schema=False)
+
+    def __disconnect__(self, rollback=False):
+        if self.konnect is None:
+            return
+
+        with suppress(SQLError):
+            if rollback:
+                self.konnect.rollback()
+            self.kursor.close()
+            self.konnect.close()
+
+        self.konnect = self.kursor = None
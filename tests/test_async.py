@@ -0,0 +1,71 @@
+import asyncio
+
+from src.asyncdb import AsyncMashaDB
+
+
+def connect(database=':memory:', pool_size=10):
+    async def connect():
+        db = AsyncMashaDB(backend='sqlite', database=database, pool_size=pool_size)
+        db.verbose = False
+        await db.connect()
+        await db.create('users', id='INT AUTO_INCREMENT PRIMARY KEY', name='VARCHAR(40)')
+        await db.commit()
+        return db
+
+    return connect()
+
+
+def test_transaction_commits_the_writes_of_gathered_tasks(tmp_path):
+    async def main():
+        db = await connect(str(tmp_path / 'async.db'), pool_size=4)
+        async with db.transaction():
+            await asyncio.gather(*(db.users.write(name=name) for name in ('Al', 'Bo', 'Cy')))
+        await db.closeall()
+
+        db = await connect(str(tmp_path / 'async.db'))
+        count = await db.users.rows
+        await db.closeall()
+        return count
+
+    assert asyncio.run(main()) == 3
+
+
+def test_transaction_rolls_back_when_the_block_raises(tmp_path):
+    async def main():
+        db = await connect(str(tmp_path / 'async.db'), pool_size=4)
+        try:
+            async with db.transaction():
+                await asyncio.gather(db.users.write(name='Al'), db.users.write(name='Bo'))
+                raise KeyError('stop')
+        except KeyError:
+            pass
+        count = await db.users.rows
+        await db.closeall()
+        return count
+
+    assert asyncio.run(main()) == 0
+
+
+def test_tasks_started_after_a_write_share_its_connection():
+    async def main():
+        db = await connect()
+        await db.users.write(name='Al')
+        counts = await asyncio.wait_for(asyncio.gather(db.users.rows, db.users.rows), timeout=5)
+        await asyncio.gather(db.users.write(name='Bo'))
+        await db.commit()
+        return counts, await db.users.rows
+
+    assert asyncio.run(main()) == ([1, 1], 2)
+
+
+def test_uncommitted_task_writes_are_rolled_back_with_an_alert(tmp_path, capsys):
+    async def main():
+        db = await connect(str(tmp_path / 'async.db'), pool_size=4)
+        await asyncio.gather(db.users.write(name='Al'))
+        await asyncio.sleep(0.1)
+        count = await db.users.rows
+        await db.closeall()
+        return count
+
+    assert asyncio.run(main()) == 0
+    assert 'without commit()' in capsys.readouterr().out
@@ -0,0 +1,16 @@
+import pytest
+
+from src import loader
+
+
+def test_spool_writes_quoted_fields(tmp_path):
+    path, records = loader.spool([{'name': 'Al "Bo"', 'age': 3}, ('Cy', None)], ['name', 'age'], directory=tmp_path)
+    with open(path) as spooled:
+        assert spooled.read() == '"Al ""Bo""",3\n"Cy",NULL\n'
+    assert records == 2
+
+
+def test_spool_removes_its_file_when_a_row_fails(tmp_path):
+    with pytest.raises(KeyError):
+        loader.spool([{'name': 'Al'}, {'nom': 'Bo'}], ['name'], directory=tmp_path)
+    assert list(tmp_path.iterdir()) == []
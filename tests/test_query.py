@@ -0,0 +1,13 @@
+from src.query import keyset, split
+
+
+def test_keyset_selects_every_column_as_table_star():
+    statement = keyset('users', '*', 'id', ())
+    assert statement == "SELECT id, users.* FROM users WHERE id > %s ORDER BY id LIMIT 1000"
+
+
+def test_keyset_first_page_has_no_key_condition():
+    shape, params = split({'city': 'Berlin or Paris'})
+    statement = keyset('users', 'email', 'id', shape, size=50, first=True)
+    assert statement == "SELECT id, email FROM users WHERE ((city=%s OR city=%s)) ORDER BY id LIMIT 50"
+    assert params == ['Berlin', 'Paris']
@@ -0,0 +1,314 @@
+import time
+import threading
+
+import pytest
+
+from src.mashadb import MashaDB
+from src.sharding import ShardedMashaDB
+from src.backends import placeholders
+
+
+@pytest.fixture
+def db():
+    db = MashaDB(backend='sqlite')
+    db.verbose = False
+    db.connect()
+    db.create('users', id='INT AUTO_INCREMENT PRIMARY KEY', name='VARCHAR(40)', city='VARCHAR(40)')
+    db.users.write_many([{'name': name, 'city': city} for name, city in
+                         [('Al', 'Berlin'), ('Bo', 'Paris'), ('Cy', 'Berlin'), ('Di', 'Rome'), ('Ed', '%s')]])
+    db.commit()
+    yield db
+    db.closeall()
+
+
+def test_placeholders_skip_quoted_literals():
+    assert placeholders("SELECT * FROM t WHERE a LIKE '%s' AND b=%s") == "SELECT * FROM t WHERE a LIKE '%s' AND b=?"
+    assert placeholders("SELECT 5 %% 3, \"%s\", 'it''s %s' FROM t WHERE c=%s") == "SELECT 5 % 3, \"%s\", 'it''s %s' FROM t WHERE c=?"
+
+
+def test_schema(db):
+    assert db.tables == ('users',)
+    assert db.users.columns == ['id', 'name', 'city']
+    assert db.users.primary == 'id'
+    assert db.users.rows == 5
+
+
+def test_where(db):
+    assert db.users.select('name').where(city='Berlin or Rome') == [('Al',), ('Cy',), ('Di',)]
+    assert db.users.select('name').where(id='2..3', op='and') == [('Bo',), ('Cy',)]
+    assert db.users.select('name').where("city = '%s'") == [('Ed',)]
+    assert db.execute("SELECT name FROM users WHERE city = '%s'") == ('Ed',)
+    assert db.users.record_exists('name', 'Bo')
+    assert db.users.distinct('city', count=True) == 4
+
+
+def test_all_and_iter(db):
+    assert db.users.select('name').all(sort='name desc', limit=2) == [('Ed',), ('Di',)]
+    assert list(db.users.select('id').iter(chunk_size=2)) == [(1,), (2,), (3,), (4,), (5,)]
+
+
+def test_paginate(db):
+    pages = list(db.users.select().paginate(2))
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert pages[0][0] == (1, 'Al', 'Berlin')
+
+
+def test_upsert_and_update_many(db):
+    db.users.upsert_many([{'id': 1, 'name': 'Ann', 'city': 'Oslo'}, {'id': 6, 'name': 'Fe', 'city': 'Rome'}])
+    db.users.update_many({2: {'city': 'Lyon'}, 3: {'city': 'Nice', 'name': 'Cid'}})
+    assert db.users.select('name', 'city').where(id='1..3') == [('Ann', 'Oslo'), ('Bo', 'Lyon'), ('Cid', 'Nice')]
+    assert db.users.rows == 6
+
+
+def test_update_many_batches_fit_the_packet(db):
+    db._max_packet = 1024 + 3000
+    assert db.users.update_many({id: {'city': 'x' * 500} for id in range(1, 6)}) == [2, 2, 1]
+    assert db.users.select('city').where(id='5') == [('x' * 500,)]
+
+
+def test_delete_and_update_where(db):
+    assert db.users.update_where(set={'city': 'Bonn'}, city='Berlin', chunk_size=1) == 2
+    assert db.users.delete_where(city='Bonn or Rome') == 3
+    assert db.users.select('name').all() == [('Bo',), ('Ed',)]
+
+
+def test_add_column(db):
+    db.users.add('email', 'VARCHAR(255)')
+    assert db.users.columns == ['id', 'name', 'city', 'email']
+    assert db.users.schema.types['email'] == 'VARCHAR(255)'
+    with pytest.raises(ValueError):
+        db.users.add('phone', 'INT', location='after name')
+
+
+def test_dedicated_connections_need_a_database_file(db):
+    with pytest.raises(ValueError):
+        db.users.buffered_writer()
+    with pytest.raises(ValueError):
+        db.users.export('users.csv')
+
+
+def test_buffered_writer(tmp_path):
+    db = MashaDB(backend='sqlite', database=str(tmp_path / 'writer.db'))
+    db.verbose = False
+    db.connect()
+    db.create('events', id='INT AUTO_INCREMENT PRIMARY KEY', kind='TEXT')
+    db.commit()
+    with db.events.buffered_writer(max_rows=2) as writer:
+        for kind in ('login', 'view', 'logout'):
+            writer.write(kind=kind)
+    assert writer.written == 3
+    assert db.events.select('kind').all() == [('login',), ('view',), ('logout',)]
+    db.closeall()
+
+
+def test_rollback(db):
+    db.users.write(name='Gus', city='Oslo')
+    db.rollback()
+    assert db.users.rows == 5
+
+
+def test_fetchone_reads_are_recorded_at_once(db):
+    events = []
+    db.on_query(events.append)
+    assert db.users.rows == 5
+    assert [(event.operation, event.table, event.rows) for event in events] == [('SELECT', 'users', 1)]
+    assert db.stats()['tables']['users']['SELECT']['count'] == 1
+    assert db.users.distinct('city', count=True) == 4
+    assert len(events) == 2
+
+
+def test_pooled_stream_sees_uncommitted_writes(tmp_path):
+    db = MashaDB(backend='sqlite', database=str(tmp_path / 'pool.db'), pool_size=1)
+    db.verbose = False
+    db.connect()
+    db.create('events', id='INT AUTO_INCREMENT PRIMARY KEY', kind='TEXT')
+    db.commit()
+    db.events.write(kind='login')
+    assert list(db.events.select('kind').iter()) == [('login',)]
+    db.commit()
+    db.closeall()
+
+
+def test_pooled_connect_returns_its_connection(tmp_path):
+    setup = MashaDB(backend='sqlite', database=str(tmp_path / 'pool.db'))
+    setup.verbose = False
+    setup.connect()
+    setup.create('events', id='INT AUTO_INCREMENT PRIMARY KEY', kind='TEXT')
+    setup.commit()
+    setup.closeall()
+
+    db = MashaDB(backend='sqlite', database=str(tmp_path / 'pool.db'), pool_size=1)
+    db.verbose = False
+    db.connect()
+    rows = []
+    worker = threading.Thread(target=lambda: rows.append(db.events.rows), daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+    assert rows == [0]
+    db.closeall()
+
+
+def test_sharded_distinct_count_leaves_out_null(tmp_path):
+    db = ShardedMashaDB([{'database': str(tmp_path / 'shard0.db')}, {'database': str(tmp_path / 'shard1.db')}],
+                        tables={'visits': 'id'}, backend='sqlite')
+    db.verbose = False
+    for shard in db.shards:
+        shard.verbose = False
+    db.connect()
+    for shard in db.shards:
+        shard.create('visits', id='INT PRIMARY KEY', city='TEXT')
+    for id, city in enumerate(['Rome', 'Oslo', None, 'Lima', 'Kyiv', 'Bern', 'Rome', None]):
+        db.visits.write(id=id, city=city)
+    db.commit()
+    assert db.visits.distinct('city', count=True) == 5
+    assert sorted(db.visits.distinct('city'), key=str) == ['Bern', 'Kyiv', 'Lima', None, 'Oslo', 'Rome']
+    db.closeall()
+
+
+def test_batch_commits_every_n_operations(db):
+    reports = []
+    with db.batch(commit_every=2, report=reports.append) as batch:
+        for name in ('Fe', 'Gus', 'Hal'):
+            db.users.write(name=name, city='Oslo')
+    assert [(entry['operations'], entry['rows'], entry['committed']) for entry in batch.batches] == [(2, 2, True), (1, 1, True)]
+    assert reports == batch.batches
+    db.rollback()
+    assert db.users.rows == 8
+
+
+def test_batch_rolls_back_the_failed_batch_only(db):
+    with db.batch(commit_every=2) as batch:
+        db.users.write(name='Fe', city='Oslo')
+        db.users.write(name='Gus', city='Oslo')
+        db.users.write(name='Hal', city='Oslo')
+        db.users.write(name='Ivo', zip='Oslo')
+        db.users.write(name='Jo', city='Oslo')
+    assert [entry['committed'] for entry in batch.batches] == [True, False, True]
+    assert batch.batches[1]['error'] == 'table users has no column named zip'
+    summary = batch.summary()
+    assert [summary[key] for key in ('batches', 'committed', 'rolled_back', 'operations', 'rows')] == [3, 2, 1, 3, 3]
+    assert db.users.select('name').where(city='Oslo') == [('Fe',), ('Gus',), ('Jo',)]
+
+
+def test_batch_rolls_back_the_open_batch_on_exception(db):
+    with pytest.raises(KeyError):
+        with db.batch(commit_every=2) as batch:
+            db.users.write(name='Fe', city='Oslo')
+            db.users.write(name='Gus', city='Oslo')
+            db.users.write(name='Hal', city='Oslo')
+            raise KeyError('stop')
+    assert [entry['committed'] for entry in batch.batches] == [True, False]
+    assert db.users.select('name').where(city='Oslo') == [('Fe',), ('Gus',)]
+
+
+def test_pipeline_returns_results_in_call_order(db):
+    with db.pipeline(max_statements=2) as pipe:
+        berlin = pipe.users.select('name').where(city='Berlin')
+        count = pipe.users.rows
+        written = pipe.users.write(name='Fe', city='Oslo')
+        cities = pipe.users.distinct('city')
+    assert (berlin.value, count.value, written.value) == ([('Al',), ('Cy',)], 5, 1)
+    assert cities.value == ('Berlin', 'Paris', 'Rome', '%s', 'Oslo')
+    assert pipe.send() == []
+
+
+def test_pipeline_stops_at_a_failed_statement(db):
+    pipe = db.pipeline()
+    pipe.users.rows
+    failed = pipe.users.write(name='Fe', zip='Oslo')
+    skipped = pipe.users.rows
+    assert pipe.send() == [5, None, None]
+    assert failed.error == 'table users has no column named zip'
+    assert skipped.error.startswith('not run')
+
+
+def test_pipeline_is_discarded_on_exception(db):
+    with pytest.raises(KeyError):
+        with db.pipeline() as pipe:
+            written = pipe.users.write(name='Fe', city='Oslo')
+            raise KeyError('stop')
+    assert not written.done
+    assert db.users.rows == 5
+
+
+def test_query_cache_is_invalidated_by_writes():
+    db = MashaDB(backend='sqlite', query_cache=True)
+    db.verbose = False
+    db.connect()
+    db.create('users', id='INT AUTO_INCREMENT PRIMARY KEY', name='VARCHAR(40)')
+    db.create('towns', name='VARCHAR(40)')
+    db.users.write(name='Al')
+    db.towns.write(name='Rome')
+    db.commit()
+    cache = db.query_cache
+    assert db.users.select('name').all() == db.users.select('name').all() == [('Al',)]
+    assert db.towns.select('name').all() == [('Rome',)]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    db.users.write(name='Bo')
+    assert db.users.select('name').all() == [('Al',), ('Bo',)]
+    assert db.towns.select('name').all() == [('Rome',)]
+    assert (cache.hits, cache.misses) == (2, 3)
+
+    db.rollback()
+    assert db.users.select('name').all() == [('Al',)]
+    db.execute("UPDATE users SET name='Ann'")
+    assert db.users.select('name').all() == [('Ann',)]
+    db.commit()
+    assert db.users.select('name').all() == [('Ann',)]
+    db.closeall()
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    """a primary and two replicas whose users table names its database"""
+    for name in ('primary', 'replica1', 'replica2'):
+        db = MashaDB(backend='sqlite', database=str(tmp_path / f'{name}.db'))
+        db.verbose = False
+        db.connect()
+        db.create('users', id='INT PRIMARY KEY', name='VARCHAR(40)')
+        db.users.write(id=1, name=name)
+        db.commit()
+        db.closeall()
+
+    def replicated(replicas=2, **kwargs):
+        db = MashaDB(backend='sqlite', database=str(tmp_path / 'primary.db'),
+                     replicas=[{'database': str(tmp_path / f'replica{n}.db')} for n in range(1, replicas + 1)], **kwargs)
+        db.verbose = False
+        db.connect()
+        return db
+
+    return replicated
+
+
+def test_reads_go_to_replicas_until_the_thread_writes(replicated):
+    db = replicated()
+    assert [db.users.select('name').where(id=1) for _ in range(3)] == [[('replica1',)], [('replica2',)], [('replica1',)]]
+    db.users.write(id=2, name='new')
+    assert db.users.select('name').all() == [('primary',), ('new',)]
+    db.commit()
+    assert db.users.select('name').all() == [('replica2',)]
+    db.closeall()
+
+
+def test_reads_stay_on_the_primary_for_read_your_writes(replicated):
+    db = replicated(read_your_writes=60)
+    db.users.update(1, name='updated')
+    db.commit()
+    assert db.users.select('name').all() == [('updated',)]
+    db.closeall()
+
+
+def test_replica_reads_are_cached_only_with_a_ttl(replicated):
+    db = replicated(query_cache=True)
+    assert db.users.select('name').all() == [('replica1',)]
+    assert len(db.query_cache) == 0
+    db.closeall()
+
+    db = replicated(replicas=1, query_cache={'ttl': 0.2})
+    assert db.users.select('name').all() == db.users.select('name').all() == [('replica1',)]
+    assert (db.query_cache.hits, db.query_cache.misses) == (1, 1)
+    time.sleep(0.3)
+    assert db.users.select('name').all() == [('replica1',)]
+    assert db.query_cache.expired == 1
+    db.closeall()